@@ -0,0 +1,277 @@
+"""Latency and throughput benchmarks for the API hot paths.
+
+Optionally seeds the database at a preset scale, starts the app under
+uvicorn and then drives each scenario with a fixed concurrency. Results
+are printed (or written) as JSON so runs can be diffed:
+
+    python -m benchmarks.api --seed-scale small --start-server --output bench.json
+
+The scenarios send far more requests per client than the rate limiter
+allows, so --start-server runs the app with RATE_LIMIT_ENABLED=false. A
+server given with --base-url needs the same setting, or the results are
+mostly 429s.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+import websockets
+
+from src.config import Config
+from src.db import seed_database
+
+SEED_SCALES = {
+    "small": ["--users", "1000", "--ideas", "10000", "--votes", "100000"],
+    "medium": ["--users", "20000", "--ideas", "200000", "--votes", "2000000"],
+    "large": ["--users", "200000", "--ideas", "2000000", "--votes", "20000000"],
+}
+
+API_PREFIX = "/api/v1"
+
+# seed_database gives every user this password; user0 is used for authed calls
+BENCH_EMAIL = "user0@example.com"
+
+
+def summarize(name: str, latencies: List[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    return {
+        "scenario": name,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": (len(latencies) / elapsed) if elapsed else 0.0,
+        "mean_ms": statistics.mean(latencies) if latencies else 0.0,
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+async def run_scenario(
+    name: str,
+    request: Callable[[int], Awaitable[httpx.Response]],
+    requests: int,
+    concurrency: int,
+) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                response = await request(i)
+                response.raise_for_status()
+            except (httpx.HTTPError, websockets.WebSocketException, OSError):
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - started)
+
+
+async def login(client: httpx.AsyncClient) -> httpx.Response:
+    return await client.post(
+        f"{API_PREFIX}/auth/login",
+        json={"email": BENCH_EMAIL, "password": seed_database.SEED_PASSWORD},
+    )
+
+
+async def websocket_fanout(
+    base_url: str,
+    client: httpx.AsyncClient,
+    idea_id: str,
+    headers: Dict[str, str],
+    listeners: int,
+    rounds: int,
+) -> dict:
+    """Time from a vote change until every listener has seen the update."""
+    ws_url = base_url.replace("http", "ws", 1)
+    url = f"{ws_url}{API_PREFIX}/ideas/{idea_id}/votes/ws"
+    sockets = [await websockets.connect(url) for _ in range(listeners)]
+    # drain the initial vote counts each socket receives on connect
+    await asyncio.gather(*(ws.recv() for ws in sockets))
+
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await client.post(
+            f"{API_PREFIX}/ideas/{idea_id}/votes",
+            json={"is_upvote": True},
+            headers=headers,
+        )
+        start = time.perf_counter()
+        response = await client.delete(
+            f"{API_PREFIX}/ideas/{idea_id}/votes", headers=headers
+        )
+        try:
+            response.raise_for_status()
+            await asyncio.wait_for(
+                asyncio.gather(*(ws.recv() for ws in sockets)), timeout=5
+            )
+        except (httpx.HTTPError, asyncio.TimeoutError):
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    elapsed = time.perf_counter() - started
+
+    await asyncio.gather(*(ws.close() for ws in sockets))
+    result = summarize("ws_fanout", latencies, errors, elapsed)
+    result["listeners"] = listeners
+    return result
+
+
+async def run(args: argparse.Namespace) -> List[dict]:
+    results = []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=30
+    ) as client:
+        token = (await login(client)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        first_page = (await client.get(f"{API_PREFIX}/ideas/")).json()
+        idea_ids = [idea["id"] for idea in first_page["items"]]
+
+        # walk the cursor so the deep page scenario starts far down the feed
+        cursor = first_page["next_cursor"]
+        for _ in range(args.cursor_depth - 1):
+            if cursor is None:
+                break
+            page = await client.get(f"{API_PREFIX}/ideas/", params={"cursor": cursor})
+            cursor = page.json()["next_cursor"]
+
+        scenarios = {
+            "feed_anonymous": lambda i: client.get(f"{API_PREFIX}/ideas/"),
+            "feed_authed": lambda i: client.get(
+                f"{API_PREFIX}/ideas/", headers=headers
+            ),
+            "feed_text_search": lambda i: client.get(
+                f"{API_PREFIX}/ideas/", params={"text": args.search_text}
+            ),
+            "feed_cursor_depth": lambda i: client.get(
+                f"{API_PREFIX}/ideas/", params={"cursor": cursor} if cursor else None
+            ),
+            "idea_detail": lambda i: client.get(
+                f"{API_PREFIX}/ideas/{idea_ids[i % len(idea_ids)]}"
+            ),
+            "vote": lambda i: client.post(
+                f"{API_PREFIX}/ideas/{idea_ids[i % len(idea_ids)]}/votes",
+                json={"is_upvote": i % 3 != 0},
+                headers=headers,
+            ),
+            "login": lambda i: login(client),
+        }
+        for name, request in scenarios.items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            requests = args.requests if name != "login" else args.login_requests
+            results.append(
+                await run_scenario(name, request, requests, args.concurrency)
+            )
+
+        if not args.scenarios or "ws_fanout" in args.scenarios:
+            results.append(
+                await websocket_fanout(
+                    args.base_url,
+                    client,
+                    idea_ids[0],
+                    headers,
+                    args.ws_listeners,
+                    args.ws_rounds,
+                )
+            )
+    return results
+
+
+def start_server(args: argparse.Namespace) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.setdefault("ALLOWED_HOSTS", "localhost,127.0.0.1")
+    env["RATE_LIMIT_ENABLED"] = "false"
+    port = args.base_url.rsplit(":", 1)[-1].rstrip("/")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src:app", "--port", port]
+        + ["--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{args.base_url}{API_PREFIX}/openapi.json").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("server did not start within 30s")
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--base-url",
+        default="http://127.0.0.1:8000",
+        help="must run with RATE_LIMIT_ENABLED=false unless --start-server",
+    )
+    parser.add_argument("--start-server", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed-scale", choices=SEED_SCALES)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cursor-depth", type=int, default=20)
+    parser.add_argument("--search-text", default="dark mode")
+    parser.add_argument("--ws-listeners", type=int, default=100)
+    parser.add_argument("--ws-rounds", type=int, default=50)
+    parser.add_argument("--scenarios", nargs="*", help="only run these scenarios")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    if args.seed_scale:
+        asyncio.run(
+            seed_database.main(
+                seed_database.parse_args(
+                    SEED_SCALES[args.seed_scale]
+                    + ["--reset", "--database-url", Config.DATABASE_URL]
+                )
+            )
+        )
+
+    server = start_server(args) if args.start_server else None
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    report = json.dumps(
+        {"base_url": args.base_url, "seed_scale": args.seed_scale, "results": results},
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compression ratio and CPU cost per algorithm/level on real feed payloads.
+
+Used to pick the COMPRESSION_* levels in Settings:
+    python -m benchmarks.compression --limit 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from src.compression import COMPRESSORS
+from src.db.main import async_session_maker
+from src.ideas.schemas import IdeaSearchParams
+from src.ideas.services import IdeaService
+from src.responses import ORJSONResponse
+
+LEVELS = {"gzip": range(1, 10), "br": range(0, 12), "zstd": range(1, 20, 2)}
+
+idea_service = IdeaService()
+
+
+async def feed_payload(limit: int) -> bytes:
+    async with async_session_maker() as session:
+        ideas, next_cursor = await idea_service.search_ideas(
+            session, IdeaSearchParams(limit=limit)
+        )
+    return ORJSONResponse(
+        {"items": ideas, "next_cursor": str(next_cursor) if next_cursor else None}
+    ).body
+
+
+def measure(encoding: str, level: int, payload: bytes, iterations: int) -> dict:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        compressor = COMPRESSORS[encoding](level)
+        compressed = compressor.compress(payload) + compressor.finish()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "encoding": encoding,
+        "level": level,
+        "ratio": round(len(payload) / len(compressed), 3),
+        "compressed_bytes": len(compressed),
+        "p50_us": round(timings[len(timings) // 2] * 1e6, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    payload = asyncio.run(feed_payload(args.limit))
+    results = [
+        measure(encoding, level, payload, args.iterations)
+        for encoding in COMPRESSORS
+        for level in LEVELS[encoding]
+    ]
+    print(json.dumps({"payload_bytes": len(payload), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
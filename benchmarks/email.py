@@ -0,0 +1,136 @@
+"""Emails/sec for a worker: a new SMTP session per message vs the SMTPPool.
+
+Runs against a local SMTP stand-in. Its greeting is delayed by
+``--handshake-ms`` to stand in for the TCP, STARTTLS and AUTH round trips a
+real relay costs on every new connection:
+    python -m benchmarks.email --messages 200 --handshake-ms 40
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from fastapi_mail import ConnectionConfig, FastMail
+
+from src.celery_tasks import WorkerLoop
+from src.mail import SMTPPool, create_message
+
+
+class StandInSMTPServer:
+    """Just enough ESMTP to accept messages from aiosmtplib."""
+
+    def __init__(self, handshake_ms: float):
+        self.handshake = handshake_ms / 1000
+        self.connections = 0
+        self.messages = 0
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        writer.write(b"220 bench ESMTP\r\n")
+        while line := await reader.readline():
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                writer.write(b"250-bench\r\n250 8BITMIME\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                while (await reader.readline()) != b".\r\n":
+                    pass
+                self.messages += 1
+                writer.write(b"250 OK\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def start(self) -> None:
+        server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle, "127.0.0.1", 0)
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+
+def stand_in_config(port: int) -> ConnectionConfig:
+    return ConnectionConfig(
+        MAIL_USERNAME="bench",
+        MAIL_PASSWORD="bench",
+        MAIL_FROM="bench@example.com",
+        MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_FROM_NAME="Bench",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False,
+    )
+
+
+def run(name: str, server: StandInSMTPServer, send, messages: int) -> dict:
+    connections = server.connections
+    started = time.perf_counter()
+    for i in range(messages):
+        message = create_message(
+            recipients=[f"user{i}@example.com"],
+            subject="Verify your email",
+            body=f"<p>Please verify: https://example.com/verify/{i}</p>",
+        )
+        send(message)
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": name,
+        "messages": messages,
+        "emails_per_sec": round(messages / elapsed, 1),
+        "smtp_connections": server.connections - connections,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    server = StandInSMTPServer(args.handshake_ms)
+    server.start()
+    config = stand_in_config(server.port)
+
+    # what send_email did before: a fresh loop and SMTP session per message
+    mail = FastMail(config)
+    per_message = run(
+        "connection_per_message",
+        server,
+        lambda message: async_to_sync(mail.send_message)(message),
+        args.messages,
+    )
+
+    worker_loop = WorkerLoop()
+    worker_loop.run(asyncio.sleep(0))
+    pool = SMTPPool(config)
+    pooled = run(
+        "pooled",
+        server,
+        lambda message: worker_loop.run(pool.send_message(message)),
+        args.messages,
+    )
+    worker_loop.run(pool.close())
+
+    print(
+        json.dumps(
+            {"handshake_ms": args.handshake_ms, "results": [per_message, pooled]},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
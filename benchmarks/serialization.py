@@ -0,0 +1,96 @@
+"""Share of feed latency spent serializing the response.
+
+Runs the feed query once per iteration, then encodes the page the old way
+(str()/isoformat() per field, jsonable_encoder, then JSONResponse) and the
+new way (native UUIDs and datetimes straight into ORJSONResponse):
+    python -m benchmarks.serialization --limit 20
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import statistics
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.db.main import async_session_maker
+from src.ideas.schemas import IdeaSearchParams
+from src.ideas.services import IdeaService
+from src.responses import ORJSONResponse
+
+idea_service = IdeaService()
+
+
+def stringify(value):
+    """Rebuild the page as the services produced it before orjson."""
+    if isinstance(value, dict):
+        return {key: stringify(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [stringify(item) for item in value]
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_legacy(ideas: list, next_cursor) -> bytes:
+    content = {
+        "items": stringify(ideas),
+        "next_cursor": str(next_cursor) if next_cursor else None,
+    }
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def encode_orjson(ideas: list, next_cursor) -> bytes:
+    content = {"items": ideas, "next_cursor": str(next_cursor) if next_cursor else None}
+    return ORJSONResponse(content).body
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(args: argparse.Namespace) -> dict:
+    query_ms, legacy_ms, orjson_ms = [], [], []
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        async with async_session_maker() as session:
+            ideas, next_cursor = await idea_service.search_ideas(
+                session, IdeaSearchParams(limit=args.limit)
+            )
+        query_ms.append((time.perf_counter() - start) * 1000)
+        legacy_ms.append(timed(encode_legacy, ideas, next_cursor))
+        orjson_ms.append(timed(encode_orjson, ideas, next_cursor))
+
+    legacy, new = encode_legacy(ideas, next_cursor), encode_orjson(ideas, next_cursor)
+    assert json.loads(legacy) == json.loads(new), "encodings disagree"
+
+    query = statistics.median(query_ms)
+    report = {"limit": args.limit, "payload_bytes": len(new), "query_p50_ms": query}
+    for name, timings in (("legacy", legacy_ms), ("orjson", orjson_ms)):
+        encode = statistics.median(timings)
+        report[name] = {
+            "encode_p50_ms": round(encode, 3),
+            "share_of_latency": round(encode / (query + encode), 4),
+        }
+    report["query_p50_ms"] = round(query, 3)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare search_ideas latency with and without the prepared statement cache.
+
+Run against a seeded database:
+    python -m benchmarks.statement_cache --iterations 500
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import Config
+from src.db.main import build_engine
+from src.ideas.schemas import IdeaSearchParams
+from src.ideas.services import IdeaService
+
+idea_service = IdeaService()
+
+
+async def run_case(name: str, iterations: int, **engine_kwargs) -> dict:
+    engine = build_engine(**engine_kwargs)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    params = IdeaSearchParams(limit=20)
+    timings = []
+
+    async with Session() as session:
+        # warm up the connection so connect time is not measured
+        await idea_service.search_ideas(session, params)
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await idea_service.search_ideas(session, params)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    await engine.dispose()
+    timings.sort()
+    return {
+        "case": name,
+        "iterations": iterations,
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p99_ms": timings[int(len(timings) * 0.99) - 1],
+    }
+
+
+async def main(iterations: int, url: str) -> None:
+    results = [
+        await run_case(
+            "cached", iterations, url=url, pgbouncer=False, statement_cache_size=100
+        ),
+        await run_case(
+            "pgbouncer_cached",
+            iterations,
+            url=url,
+            pgbouncer=True,
+            statement_cache_size=100,
+        ),
+        await run_case(
+            "pgbouncer_uncached",
+            iterations,
+            url=url,
+            pgbouncer=True,
+            statement_cache_size=0,
+        ),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--database-url", default=Config.DATABASE_URL)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.database_url))
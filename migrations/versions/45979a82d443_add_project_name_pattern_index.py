@@ -0,0 +1,43 @@
+"""add project name pattern index
+
+Revision ID: 45979a82d443
+Revises: bd43e6412f5c
+Create Date: 2026-10-19 00:41:07.552931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45979a82d443'
+down_revision: Union[str, None] = 'bd43e6412f5c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_project_name_pattern',
+            'project',
+            ['name'],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+            postgresql_ops={'name': 'varchar_pattern_ops'},
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_project_name_pattern',
+            table_name='project',
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,67 @@
+"""add project stats
+
+Revision ID: 4aee0b26c39b
+Revises: 45979a82d443
+Create Date: 2026-10-19 01:05:19.804412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '4aee0b26c39b'
+down_revision: Union[str, None] = '45979a82d443'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL = """
+INSERT INTO project_stats
+    (project_id, idea_count, upvotes, downvotes, comment_count, last_activity_at)
+SELECT
+    project.id,
+    coalesce(ideas.idea_count, 0),
+    coalesce(votes.upvotes, 0),
+    coalesce(votes.downvotes, 0),
+    coalesce(comments.comment_count, 0),
+    greatest(ideas.last_idea_at, comments.last_comment_at)
+FROM project
+LEFT JOIN (
+    SELECT project_id, count(*) AS idea_count, max(created_at) AS last_idea_at
+    FROM idea GROUP BY project_id
+) AS ideas ON ideas.project_id = project.id
+LEFT JOIN (
+    SELECT idea.project_id,
+        count(*) FILTER (WHERE vote.is_upvote) AS upvotes,
+        count(*) FILTER (WHERE NOT vote.is_upvote) AS downvotes
+    FROM vote JOIN idea ON idea.id = vote.idea_id GROUP BY idea.project_id
+) AS votes ON votes.project_id = project.id
+LEFT JOIN (
+    SELECT idea.project_id,
+        count(*) AS comment_count,
+        max(comment.created_at) AS last_comment_at
+    FROM comment JOIN idea ON idea.id = comment.idea_id GROUP BY idea.project_id
+) AS comments ON comments.project_id = project.id
+"""
+
+
+def upgrade() -> None:
+    op.create_table('project_stats',
+    sa.Column('project_id', postgresql.UUID(), nullable=False),
+    sa.Column('idea_count', postgresql.INTEGER(), server_default=sa.text('0'), nullable=False),
+    sa.Column('upvotes', postgresql.INTEGER(), server_default=sa.text('0'), nullable=False),
+    sa.Column('downvotes', postgresql.INTEGER(), server_default=sa.text('0'), nullable=False),
+    sa.Column('comment_count', postgresql.INTEGER(), server_default=sa.text('0'), nullable=False),
+    sa.Column('last_activity_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['project.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('project_id')
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    op.drop_table('project_stats')
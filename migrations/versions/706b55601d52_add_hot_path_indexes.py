@@ -0,0 +1,60 @@
+"""add hot path indexes
+
+Revision ID: 706b55601d52
+Revises: 3772fd4f4616
+Create Date: 2026-10-18 23:19:02.025497
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '706b55601d52'
+down_revision: Union[str, None] = '3772fd4f4616'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("idx_vote_idea_id_is_upvote", "vote", ["idea_id", "is_upvote"], ["user_id"]),
+    ("idx_vote_user_id_idea_id", "vote", ["user_id", "idea_id"], None),
+    ("idx_comment_idea_id_created_at", "comment", ["idea_id", "created_at"], None),
+    ("idx_idea_created_at", "idea", ["created_at"], None),
+    ("idx_idea_project_id_created_at", "idea", ["project_id", "created_at"], None),
+    (
+        "idx_ideacategoryassociation_category_id",
+        "ideacategoryassociation",
+        ["category_id"],
+        None,
+    ),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_include=include or [],
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,37 @@
+"""add outbox
+
+Revision ID: 95cca0b18498
+Revises: 4aee0b26c39b
+Create Date: 2026-10-19 00:02:56.357000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '95cca0b18498'
+down_revision: Union[str, None] = '4aee0b26c39b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox',
+    sa.Column('id', sa.BIGINT(), nullable=False),
+    sa.Column('topic', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('attempts', sa.INTEGER(), server_default=sa.text('0'), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+    sa.Column('available_at', postgresql.TIMESTAMP(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_outbox_available_at', 'outbox', ['available_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_outbox_available_at', table_name='outbox')
+    op.drop_table('outbox')
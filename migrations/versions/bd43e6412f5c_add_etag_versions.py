@@ -0,0 +1,36 @@
+"""add etag versions
+
+Revision ID: bd43e6412f5c
+Revises: 706b55601d52
+Create Date: 2026-10-19 00:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'bd43e6412f5c'
+down_revision: Union[str, None] = '706b55601d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # constant defaults, so neither column forces a table rewrite
+    op.add_column(
+        'idea',
+        sa.Column('version', postgresql.INTEGER(), server_default=sa.text('0'), nullable=False),
+    )
+    op.add_column(
+        'project',
+        sa.Column('updated_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('project', 'updated_at')
+    op.drop_column('idea', 'version')
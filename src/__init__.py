@@ -1,12 +1,17 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from src.auth.routes import auth_router
-from src.ideas.routes import idea_router
+from src.ideas.routes import idea_batch_router, idea_router
 from src.projects.routes import project_router
+from src.metrics.routes import metrics_router
 from .errors import register_all_errors
 
 from .middleware import register_middleware
-
+from .responses import ORJSONResponse
+from .outbox import outbox_relay
+from .tasks import smtp_pool, task_backend
 
 version = "v1"
 
@@ -21,6 +26,17 @@ This REST API is able to;
 
 version_prefix = f"/api/{version}"
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await task_backend.start()
+    await outbox_relay.start()
+    yield
+    await outbox_relay.stop()
+    await task_backend.stop()
+    await smtp_pool.close()
+
+
 app = FastAPI(
     title="Ideaboard",
     description=description,
@@ -34,6 +50,8 @@ app = FastAPI(
     openapi_url=f"{version_prefix}/openapi.json",
     docs_url=f"{version_prefix}/docs",
     redoc_url=f"{version_prefix}/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 register_all_errors(app)
@@ -46,3 +64,5 @@ app.include_router(
     project_router, prefix=f"{version_prefix}/project", tags=["projects"]
 )
 app.include_router(idea_router, prefix=f"{version_prefix}/ideas", tags=["ideas"])
+app.include_router(idea_batch_router, prefix=version_prefix, tags=["ideas"])
+app.include_router(metrics_router)
@@ -5,9 +5,10 @@ from fastapi.exceptions import HTTPException
 from fastapi.responses import JSONResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.celery_tasks import send_email
 from src.db.main import get_session
 from src.db.redis import add_jti_to_blocklist
+from src.outbox import outbox_relay, outbox_service
+from src.rate_limit import rate_limit
 
 from .dependencies import AccessTokenBearer
 from .schemas import (
@@ -35,7 +36,6 @@ from src.errors import (
 )
 from src.config import Config
 
-
 auth_router = APIRouter()
 user_service = UserService()
 
@@ -67,7 +67,18 @@ async def register_user(
     }
 
 
-@auth_router.post("/login")
+@auth_router.post(
+    "/login",
+    dependencies=[
+        Depends(
+            rate_limit(
+                "login",
+                Config.RATE_LIMIT_LOGIN_PER_MINUTE,
+                Config.RATE_LIMIT_LOGIN_BURST,
+            )
+        )
+    ],
+)
 async def login_users(
     login_data: UserLoginModel,
     response: Response,
@@ -81,7 +92,7 @@ async def login_users(
     if user is not None:
         password_valid = verify_password(password, user.password_hash)
         if password_valid and not user.is_verified:
-            send_verification_mail(email)
+            await send_verification_mail(email, session)
             raise AccountNotVerified()
 
         if password_valid:
@@ -161,20 +172,19 @@ async def revoke_token(
 
 
 @auth_router.post("/password-reset-request")
-async def password_reset_request(email_data: PasswordResetRequestModel):
+async def password_reset_request(
+    email_data: PasswordResetRequestModel,
+    session: AsyncSession = Depends(get_session),
+):
     email = email_data.email
 
     token = create_url_safe_token({"email": email})
 
-    link = f"http://{Config.DOMAIN}/api/v1/auth/password-reset-confirm/{token}"
-
-    html_message = f"""
-    <h1>Reset Your Password</h1>
-    <p>Please click this <a href="{link}">link</a> to Reset Your Password</p>
-    """
-    subject = "Reset Your Password"
-
-    send_email.delay([email], subject, html_message)
+    await outbox_service.add(
+        session, "email", [email], "password_reset.html", {"token": token}
+    )
+    await session.commit()
+    outbox_relay.wake()
     return JSONResponse(
         content={
             "message": "Please check your email for instructions to reset your password",
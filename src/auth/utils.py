@@ -5,9 +5,10 @@ from itsdangerous import URLSafeTimedSerializer
 
 import jwt
 from passlib.context import CryptContext
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.celery_tasks import send_email
 from src.config import Config
+from src.outbox import outbox_relay, outbox_service
 
 passwd_context = CryptContext(schemes=["bcrypt"])
 
@@ -80,23 +81,16 @@ def decode_url_safe_token(token: str):
         logging.error(str(e))
 
 
-def send_verification_mail(email: str):
+async def send_verification_mail(email: str, session: AsyncSession):
     try:
 
         token = create_url_safe_token({"email": email})
 
-        link = f"http://{Config.DOMAIN}/api/v1/auth/verify/{token}"
-
-        html = f"""
-        <h1>Verify your Email</h1>
-        <p>Please click this <a href="{link}">link</a> to verify your email</p>
-        """
-
-        emails = [email]
-
-        subject = "Verify Your email"
-
-        send_email.delay(emails, subject, html)
+        await outbox_service.add(
+            session, "email", [email], "verify_email.html", {"token": token}
+        )
+        await session.commit()
+        outbox_relay.wake()
 
     except Exception as e:
         logging.error(str(e))
@@ -1,7 +1,26 @@
+import asyncio
+import json
 import logging
+import os
+import threading
+import uuid
 from celery import Celery
-from src.mail import mail, create_message
-from asgiref.sync import async_to_sync
+from celery.signals import worker_process_init, worker_process_shutdown
+from jinja2 import TemplateError
+from src.mail import SMTPPool, create_message, email_templates
+from src.db.redis import (
+    claim_email_flush,
+    claim_emails,
+    email_queue_length,
+    finish_emails,
+    push_emails,
+    release_email_flush,
+    requeue_emails,
+    stale_emails,
+)
+from src.db.main import async_session_maker
+from src.config import Config
+from src.projects.services import ProjectService, ProjectStatsService
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,17 +30,57 @@ c_app = Celery()
 c_app.config_from_object("src.config")
 
 
-@c_app.task(bind=True, max_retries=3)
+class WorkerLoop:
+    """One long-lived event loop per worker process, run on its own thread.
+
+    async_to_sync gave every task a fresh loop, so nothing holding
+    connections (SMTP sessions, the DB and Redis pools) could outlive a
+    task. Tasks submit coroutines here instead. The loop starts lazily, so
+    each prefork child gets its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self.loop = None
+        self.smtp_pool = None
+
+    def run(self, coro):
+        with self._lock:
+            if self._pid != os.getpid():
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self.loop.run_forever, name="worker-loop", daemon=True
+                ).start()
+                self.smtp_pool = SMTPPool()
+                self._pid = os.getpid()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self):
+        if self._pid == os.getpid():
+            self.run(self.smtp_pool.close())
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+worker_loop = WorkerLoop()
+
+
+@worker_process_init.connect
+def compile_email_templates(**kwargs):
+    email_templates.compile_all()
+
+
+@worker_process_shutdown.connect
+def close_worker_loop(**kwargs):
+    worker_loop.stop()
+
+
+@c_app.task(bind=True, max_retries=3, ignore_result=True)
 def send_email(self, recipients: list[str], subject: str, body: str):
     try:
         message = create_message(recipients=recipients, subject=subject, body=body)
-        async_to_sync(mail.send_message)(message)
+        worker_loop.run(worker_loop.smtp_pool.send_message(message))
         logger.info(f"Email sent successfully to {', '.join(recipients)}")
-        return {
-            "status": "success",
-            "message": f'Email sent to {", ".join(recipients)}',
-            "task_id": self.request.id,
-        }
     except Exception as e:
         logger.error(
             f"Failed to send email to {', '.join(recipients)}. Error: {str(e)}"
@@ -29,12 +88,189 @@ def send_email(self, recipients: list[str], subject: str, body: str):
         self.retry(exc=e, countdown=60)  # Retry after 60 seconds
 
 
-def check_email_status(task_id):
+async def queue_email(recipients: list[str], template: str, context: dict):
+    """Queue an email for the next batched flush.
+
+    The payload holds only the template name and its variables; the
+    worker renders it. Only the first email of each window publishes a
+    flush task; the rest ride along with it.
+    """
+    await push_emails(
+        json.dumps(
+            {
+                # keeps identical emails distinct while in mail:processing
+                "id": uuid.uuid4().hex,
+                "recipients": recipients,
+                "template": template,
+                "context": context,
+                "attempts": 0,
+            }
+        )
+    )
+    if await claim_email_flush(Config.MAIL_FLUSH_SECONDS):
+        # publishing is blocking I/O; keep it off the caller's event loop
+        await asyncio.to_thread(
+            flush_email_queue.apply_async,
+            countdown=Config.MAIL_BATCH_WINDOW_SECONDS,
+        )
+
+
+async def drain_email_queue() -> dict:
+    """Send what was queued when the drain started, a batch at a time.
+
+    Each batch is claimed into mail:processing and only removed once its
+    outcome is recorded. If sending fails with an exception the batch goes
+    straight back on the queue, and a batch left behind by a worker that
+    died is requeued once MAIL_PROCESSING_TIMEOUT_SECONDS have passed.
+    Either way that counts as an attempt, so a batch that keeps failing is
+    dropped after MAIL_MAX_ATTEMPTS. Retries are queued for the next flush
+    rather than this one.
+    """
+    # re-arm first, so mail queued while draining schedules its own flush
+    await release_email_flush()
+    stale = await stale_emails(Config.MAIL_PROCESSING_TIMEOUT_SECONDS)
+    if stale:
+        requeued = await return_emails(stale)
+        logger.warning(f"Requeued {requeued} emails abandoned mid-send")
+
+    totals = {"sent": 0, "refused": 0, "deferred": 0}
+    retried = False
+    remaining = await email_queue_length()
+    while remaining > 0:
+        payloads = await claim_emails(min(Config.MAIL_BATCH_SIZE, remaining))
+        if not payloads:
+            break
+        remaining -= len(payloads)
+        try:
+            retry = await send_email_batch(payloads, totals)
+        except BaseException:
+            await return_emails(payloads)
+            raise
+        await finish_emails(payloads, [json.dumps(email) for email in retry])
+        retried = retried or bool(retry)
+        if totals["deferred"]:
+            # the server is unreachable; leave the rest for the next flush
+            break
+
+    if retried and await claim_email_flush(Config.MAIL_FLUSH_SECONDS):
+        flush_email_queue.apply_async(countdown=Config.MAIL_FLUSH_SECONDS)
+    return totals
+
+
+async def return_emails(payloads: list) -> int:
+    """Requeue claimed emails that were not sent, counting the attempt."""
+    replacements = {}
+    for payload in payloads:
+        email = json.loads(payload)
+        if email["attempts"] + 1 < Config.MAIL_MAX_ATTEMPTS:
+            replacements[payload] = json.dumps(
+                {**email, "attempts": email["attempts"] + 1}
+            )
+        else:
+            logger.error(
+                f"Giving up on email to {', '.join(email['recipients'])} "
+                f"after {email['attempts'] + 1} failed sends"
+            )
+            replacements[payload] = None
+    return await requeue_emails(replacements)
+
+
+async def send_email_batch(payloads: list, totals: dict) -> list:
+    """Send one claimed batch; returns the emails to try again."""
+    emails, messages = [], []
+    for email in map(json.loads, payloads):
+        try:
+            subject, body = email_templates.render(email["template"], email["context"])
+        except TemplateError as e:
+            # retrying cannot fix a broken template, so drop the email
+            logger.error(f"Cannot render {email['template']}: {e}")
+            continue
+        emails.append(email)
+        messages.append(create_message(email["recipients"], subject, body))
+    if not messages:
+        return []
+
+    retry = []
+    outcomes = await worker_loop.smtp_pool.send_batch(messages)
+    for email, outcome in zip(emails, outcomes):
+        for recipient, status in outcome.items():
+            totals[status.split(" ", 1)[0]] += 1
+            logger.info(f"Email to {recipient} ({email['template']}): {status}")
+        # 4xx refusals are temporary, so they get another go too
+        again = [
+            recipient
+            for recipient, status in outcome.items()
+            if status == "deferred" or status.startswith("refused 4")
+        ]
+        if again and email["attempts"] + 1 < Config.MAIL_MAX_ATTEMPTS:
+            retry.append(
+                {**email, "recipients": again, "attempts": email["attempts"] + 1}
+            )
+        elif again:
+            logger.error(f"Giving up on email to {', '.join(again)}")
+    return retry
+
+
+@c_app.task(ignore_result=True)
+def flush_email_queue():
+    """Send queued mail in batches over pooled SMTP sessions."""
+    totals = worker_loop.run(drain_email_queue())
+    logger.info(f"Flushed email queue: {totals}")
+
+
+async def rebuild_all_project_stats():
+    async with async_session_maker() as session:
+        await ProjectStatsService().rebuild(session)
+        await session.commit()
+
+
+@c_app.task(ignore_result=True)
+def rebuild_project_stats():
+    """Periodic repair of project_stats; see beat_schedule in src.config."""
+    worker_loop.run(rebuild_all_project_stats())
+    logger.info("Rebuilt project stats")
+
+
+async def delete_project_in_batches(project_id: uuid.UUID, on_progress):
+    project_service = ProjectService()
+    async with async_session_maker() as session:
+        ideas_total = await project_service.count_ideas(project_id, session)
+        await project_service.delete_project(
+            project_id,
+            session,
+            batch_size=Config.PROJECT_DELETE_BATCH_SIZE,
+            on_progress=lambda totals: on_progress(
+                {**totals, "ideas_total": ideas_total}
+            ),
+        )
+    await project_service.invalidate_project_list()
+
+
+@c_app.task(bind=True)
+def delete_project(self, project_id: str):
+    """Batched delete for projects too large to remove in one request."""
+    # self.request is thread-local and the coroutine runs on the loop thread
+    task_id = self.request.id
+
+    def report(progress: dict):
+        self.update_state(task_id=task_id, state="PROGRESS", meta=progress)
+        logger.info(f"Deleting project {project_id}: {progress}")
+
+    worker_loop.run(delete_project_in_batches(uuid.UUID(project_id), report))
+    return {"project_id": project_id, "status": "deleted"}
+
+
+def check_project_deletion(task_id):
     task_result = c_app.AsyncResult(task_id)
     return {
         "task_id": task_id,
         "status": task_result.status,
-        "result": task_result.result,
+        # running totals while in progress, the final result once done
+        "result": (
+            task_result.info
+            if not isinstance(task_result.info, Exception)
+            else str(task_result.info)
+        ),
     }
 
 
@@ -1,8 +1,21 @@
+from typing import Dict, Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DB_PGBOUNCER: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    DB_SEARCH_STATEMENT_TIMEOUT_MS: int = 5000
+    DB_DETAIL_STATEMENT_TIMEOUT_MS: int = 3000
+    DB_N_PLUS_ONE_THRESHOLD: int = 5
+    DB_QUERY_STATS_HEADERS: bool = False
+    DB_SLOW_QUERY_MS: float = 500
+    DB_SLOW_QUERY_EXPLAIN_ANALYZE_RATE: float = 0.0
+    DB_SLOW_QUERY_TOP_N: int = 20
+    DB_SLOW_QUERY_PLAN_TIMEOUT_MS: int = 5000
     JWT_SECRET: str
     JWT_ALGORITHM: str
     REDIS_URL: str
@@ -16,7 +29,72 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = False
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
+    MAIL_POOL_SIZE: int = 4
+    MAIL_POOL_IDLE_CHECK_SECONDS: float = 30
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_BATCH_WINDOW_SECONDS: float = 2
+    MAIL_MAX_ATTEMPTS: int = 3
+    MAIL_FLUSH_SECONDS: int = 60
+    MAIL_PROCESSING_TIMEOUT_SECONDS: int = 600
+    TASK_BACKEND: Literal["celery", "inprocess"] = "celery"
+    TASK_QUEUE_SIZE: int = 1000
+    TASK_WORKERS: int = 4
+    TASK_MAX_RETRIES: int = 3
+    TASK_RETRY_DELAY_SECONDS: float = 5
+    TASK_DRAIN_SECONDS: float = 10
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_SECONDS: float = 1
+    OUTBOX_RETRY_SECONDS: float = 30
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_LEASE_SECONDS: float = 300
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 30
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 10
+    RATE_LIMIT_LOGIN_BURST: int = 5
+    RATE_LIMIT_VOTES_PER_MINUTE: int = 60
+    RATE_LIMIT_VOTES_BURST: int = 20
+    RATE_LIMIT_COMMENTS_PER_MINUTE: int = 20
+    RATE_LIMIT_COMMENTS_BURST: int = 10
+    RATE_LIMIT_LOCAL_HEADROOM: float = 0.5
+    RATE_LIMIT_LOCAL_MAX_ENTRIES: int = 10000
+    # proxies/load balancers in front of the app that append to
+    # X-Forwarded-For; 0 trusts only the socket address
+    RATE_LIMIT_TRUSTED_PROXY_HOPS: int = 0
+    LOAD_SHED_LIMITS: Dict[str, int] = {
+        "feed": 16,
+        "detail": 64,
+        "writes": 32,
+        "auth": 16,
+        "default": 128,
+    }
+    LOAD_SHED_QUEUE_TIMEOUT_MS: float = 250
+    LOAD_SHED_ADAPTIVE: bool = False
+    LOAD_SHED_TARGET_LATENCY_MS: Dict[str, float] = {
+        "feed": 1000,
+        "detail": 250,
+        "writes": 500,
+        "auth": 1000,
+        "default": 500,
+    }
     DOMAIN: str
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    HTTP_CACHE_MAX_AGE: int = 0
+    HTTP_CACHE_S_MAXAGE: int = 10
+    PROJECT_CACHE_TTL: int = 60
+    PROJECT_CACHE_MAX_ENTRIES: int = 256
+    PROJECT_STATS_REBUILD_SECONDS: int = 900
+    PROJECT_DELETE_ASYNC_THRESHOLD: int = 5000
+    PROJECT_DELETE_BATCH_SIZE: int = 1000
+    SINGLE_FLIGHT_REDIS: bool = False
+    SINGLE_FLIGHT_LOCK_MS: int = 2000
+    SINGLE_FLIGHT_RESULT_TTL_MS: int = 1000
+    SINGLE_FLIGHT_POLL_MS: int = 20
+    IDEA_BATCH_GET_MAX: int = 100
+    IDEA_BATCH_GET_COMMENTS: int = 3
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -26,3 +104,14 @@ Config = Settings()
 broker_url = Config.REDIS_URL
 result_backend = Config.REDIS_URL
 broker_connection_retry_on_startup = True
+beat_schedule = {
+    "rebuild-project-stats": {
+        "task": "src.celery_tasks.rebuild_project_stats",
+        "schedule": Config.PROJECT_STATS_REBUILD_SECONDS,
+    },
+    # picks up mail whose scheduled flush was lost
+    "flush-email-queue": {
+        "task": "src.celery_tasks.flush_email_queue",
+        "schedule": Config.MAIL_FLUSH_SECONDS,
+    },
+}
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER = r"(?:%s|\$\d+)(?:::\w+)?"
+PLACEHOLDER_LIST = re.compile(rf"{PLACEHOLDER}(?:\s*,\s*{PLACEHOLDER})*")
+WHITESPACE = re.compile(r"\s+")
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+LOCKING_CLAUSE = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE)\b|\bFOR\s+KEY\s+SHARE\b", re.I
+)
+
+# a slow statement shape gets its plan re-captured at most this often
+PLAN_REFRESH_SECONDS = 300
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so repeated executions compare equal.
+
+    Placeholder lists (e.g. expanded ``IN`` parameters) collapse to a
+    single ``?`` so the same query with a different number of ids still
+    counts as the same shape.
+    """
+    statement = PLACEHOLDER_LIST.sub("?", statement)
+    return WHITESPACE.sub(" ", statement).strip()
+
+
+class RequestQueryStats:
+    """Statement counters collected for a single request."""
+
+    def __init__(self):
+        self.statement_count = 0
+        self.total_time = 0.0
+        self.rows = 0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float, rows: int) -> None:
+        self.statement_count += 1
+        self.total_time += elapsed
+        self.rows += max(rows, 0)
+        self.shapes[statement_shape(statement)] += 1
+
+    def n_plus_one_suspects(
+        self, threshold: int = Config.DB_N_PLUS_ONE_THRESHOLD
+    ) -> List[Tuple[str, int]]:
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+    def as_dict(self) -> dict:
+        return {
+            "statement_count": self.statement_count,
+            "db_time_ms": round(self.total_time * 1000, 3),
+            "rows": self.rows,
+        }
+
+
+request_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
+
+
+def redact_plan(plan: Any) -> Any:
+    """Replace literal values that EXPLAIN inlines into a JSON plan."""
+    if isinstance(plan, dict):
+        return {key: redact_plan(value) for key, value in plan.items()}
+    if isinstance(plan, list):
+        return [redact_plan(value) for value in plan]
+    if isinstance(plan, str):
+        return STRING_LITERAL.sub("'?'", plan)
+    return plan
+
+
+class SlowQueryLog:
+    """Rolling top-N of the slowest statement shapes seen by this worker.
+
+    Statements slower than ``DB_SLOW_QUERY_MS`` are logged as JSON with
+    their parameters redacted. SELECTs without a locking clause also get
+    their plan captured on a separate connection, one capture at a time and
+    under DB_SLOW_QUERY_PLAN_TIMEOUT_MS, and a sample of them is run with
+    ``EXPLAIN (ANALYZE, BUFFERS)``.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = Config.DB_SLOW_QUERY_MS,
+        explain_analyze_rate: float = Config.DB_SLOW_QUERY_EXPLAIN_ANALYZE_RATE,
+        top_n: int = Config.DB_SLOW_QUERY_TOP_N,
+        plan_timeout_ms: int = Config.DB_SLOW_QUERY_PLAN_TIMEOUT_MS,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain_analyze_rate = explain_analyze_rate
+        self.top_n = top_n
+        self.plan_timeout_ms = plan_timeout_ms
+        self.engine: Optional[AsyncEngine] = None
+        self.entries: Dict[str, dict] = {}
+        self._plan_tasks = set()
+
+    def observe(self, statement: str, parameters, elapsed: float) -> None:
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+        if statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+
+        shape = statement_shape(statement)
+        entry = self.entries.setdefault(
+            shape,
+            {
+                "statement": shape,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "plan": None,
+                "plan_analyzed": False,
+                "plan_captured_at": None,
+            },
+        )
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["last_seen"] = datetime.utcnow().isoformat()
+        self._trim()
+
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "slow_query",
+                    "duration_ms": round(elapsed_ms, 3),
+                    "statement": shape[:1000],
+                    "parameter_count": len(parameters or ()),
+                }
+            )
+        )
+
+        if self._should_capture_plan(statement, entry):
+            analyze = random.random() < self.explain_analyze_rate
+            entry["plan_captured_at"] = time.monotonic()
+            task = asyncio.get_running_loop().create_task(
+                self.capture_plan(statement, parameters, shape, analyze)
+            )
+            self._plan_tasks.add(task)
+            task.add_done_callback(self._plan_tasks.discard)
+
+    def _should_capture_plan(self, statement: str, entry: dict) -> bool:
+        if self.engine is None:
+            return False
+        # EXPLAIN ANALYZE executes the statement, so never touch writes
+        if statement.lstrip()[:6].upper() not in ("SELECT", "WITH"):
+            return False
+        # nor take row locks, e.g. the outbox relay's SKIP LOCKED claim
+        if LOCKING_CLAUSE.search(statement):
+            return False
+        # one capture at a time, so plans never hold more than one
+        # pool connection
+        if self._plan_tasks:
+            return False
+        captured_at = entry["plan_captured_at"]
+        return (
+            captured_at is None or time.monotonic() - captured_at > PLAN_REFRESH_SECONDS
+        )
+
+    def _trim(self) -> None:
+        if len(self.entries) > self.top_n:
+            fastest = min(self.entries, key=lambda shape: self.entries[shape]["max_ms"])
+            del self.entries[fastest]
+
+    async def capture_plan(
+        self, statement: str, parameters, shape: str, analyze: bool
+    ) -> None:
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        try:
+            async with self.engine.connect() as conn:
+                # re-running a slow query must not pin the connection
+                await conn.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {int(self.plan_timeout_ms)}"
+                )
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN ({options}) {statement}", parameters
+                )
+                plan = result.scalar()
+                # ANALYZE really ran the statement; make sure nothing sticks
+                await conn.rollback()
+        except SQLAlchemyError:
+            logger.exception("Failed to capture plan for slow query")
+            return
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plan = redact_plan(plan)
+
+        entry = self.entries.get(shape)
+        if entry is not None:
+            entry["plan"] = plan
+            entry["plan_analyzed"] = analyze
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "slow_query_plan",
+                    "statement": shape[:1000],
+                    "analyzed": analyze,
+                    "plan": plan,
+                }
+            )
+        )
+
+    def report(self) -> List[dict]:
+        return sorted(
+            (
+                {
+                    key: value
+                    for key, value in entry.items()
+                    if key != "plan_captured_at"
+                }
+                for entry in self.entries.values()
+            ),
+            key=lambda entry: entry["max_ms"],
+            reverse=True,
+        )
+
+
+slow_query_log = SlowQueryLog()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed, cursor.rowcount)
+    slow_query_log.observe(statement, parameters, elapsed)
+
+
+def handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def register_query_instrumentation(engine: AsyncEngine) -> None:
+    slow_query_log.engine = engine
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
+
+
+def log_query_stats(method: str, path: str, stats: RequestQueryStats) -> None:
+    logger.debug("%s %s - %s", method, path, stats.as_dict())
+    for shape, count in stats.n_plus_one_suspects():
+        logger.warning(
+            "Possible N+1 in %s %s: statement ran %d times: %s",
+            method,
+            path,
+            count,
+            shape[:200],
+        )
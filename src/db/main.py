@@ -1,11 +1,56 @@
+import uuid
+
+from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel, create_engine
+from sqlmodel import SQLModel, create_engine, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.config import Config
+from src.db.instrumentation import register_query_instrumentation
+from src.metrics.collectors import register_pool_metrics
+
+
+def get_connect_args(
+    pgbouncer: bool = Config.DB_PGBOUNCER,
+    statement_cache_size: int = Config.DB_STATEMENT_CACHE_SIZE,
+) -> dict:
+    # asyncpg names its prepared statements per connection, which breaks
+    # behind PgBouncer in transaction mode where the server connection can
+    # change between transactions. In that mode asyncpg's own cache is turned
+    # off and every statement gets a unique name, while SQLAlchemy's
+    # prepared statement cache stays tunable.
+    connect_args = {"prepared_statement_cache_size": statement_cache_size}
+    if pgbouncer:
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = (
+            lambda: f"__asyncpg_{uuid.uuid4()}__"
+        )
+    elif Config.DB_STATEMENT_TIMEOUT_MS:
+        # PgBouncer rejects unknown startup parameters, so behind it the
+        # default timeout has to be set on the database role instead
+        connect_args["server_settings"] = {
+            "statement_timeout": str(Config.DB_STATEMENT_TIMEOUT_MS)
+        }
+    return connect_args
+
+
+def build_engine(
+    url: str = Config.DATABASE_URL,
+    pgbouncer: bool = Config.DB_PGBOUNCER,
+    statement_cache_size: int = Config.DB_STATEMENT_CACHE_SIZE,
+) -> AsyncEngine:
+    return AsyncEngine(
+        create_engine(
+            url=url,
+            connect_args=get_connect_args(pgbouncer, statement_cache_size),
+        )
+    )
+
 
-async_engine = AsyncEngine(create_engine(url=Config.DATABASE_URL))
+async_engine = build_engine()
+register_query_instrumentation(async_engine)
+register_pool_metrics(async_engine)
 
 
 async def init_db() -> None:
@@ -13,10 +58,41 @@ async def init_db() -> None:
         await conn.run_sync(SQLModel.metadata.create_all)
 
 
+async_session_maker = sessionmaker(
+    bind=async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
 async def get_session() -> AsyncSession:
-    Session = sessionmaker(
-        bind=async_engine, class_=AsyncSession, expire_on_commit=False
+    async with async_session_maker() as session:
+        yield session
+
+
+async def apply_statement_timeout(session: AsyncSession, timeout_ms: int) -> None:
+    """Cap every statement in the session's current transaction.
+
+    Uses ``set_config(..., is_local => true)``, the parameterizable form of
+    ``SET LOCAL statement_timeout``. The backend pid is remembered so the
+    query can be cancelled server-side if the client disconnects.
+    """
+    result = await session.execute(
+        select(
+            func.set_config("statement_timeout", str(timeout_ms), True),
+            func.pg_backend_pid(),
+        )
     )
+    session.info["backend_pid"] = result.one()[1]
 
-    async with Session() as session:
-        yield session
+
+def statement_timeout(timeout_ms: int):
+    """Dependency form of ``apply_statement_timeout`` for the request's session."""
+
+    async def set_statement_timeout(session: AsyncSession = Depends(get_session)):
+        await apply_statement_timeout(session, timeout_ms)
+
+    return set_statement_timeout
+
+
+async def cancel_backend(pid: int) -> None:
+    async with async_engine.connect() as conn:
+        await conn.execute(select(func.pg_cancel_backend(pid)))
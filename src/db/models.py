@@ -12,6 +12,7 @@ from sqlmodel import (
 from typing import Optional, List
 from datetime import datetime
 import sqlalchemy.dialects.postgresql as pg
+from sqlalchemy import func, text
 
 
 # User Model
@@ -45,9 +46,91 @@ class Project(SQLModel, table=True):
     creted_at: datetime = Field(
         sa_column=Column(pg.TIMESTAMP, default=datetime.utcnow())
     )
+    # drives the project listing ETag
+    updated_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            pg.TIMESTAMP,
+            default=datetime.utcnow,
+            onupdate=datetime.utcnow,
+            server_default=func.now(),
+        ),
+    )
 
     ideas: List["Idea"] = Relationship(back_populates="project")
     creator: User = Relationship(back_populates="projects")
+    __table_args__ = (
+        # lets the name_prefix filter (LIKE 'prefix%') use an index
+        Index(
+            "idx_project_name_pattern",
+            "name",
+            postgresql_ops={"name": "varchar_pattern_ops"},
+        ),
+    )
+
+
+# Rolled-up counters per project, kept in step with idea, vote and comment
+# writes and periodically rebuilt from scratch
+class ProjectStats(SQLModel, table=True):
+    __tablename__ = "project_stats"
+
+    project_id: uuid.UUID = Field(
+        sa_column=Column(
+            pg.UUID,
+            ForeignKey("project.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    idea_count: int = Field(
+        default=0,
+        sa_column=Column(pg.INTEGER, nullable=False, server_default=text("0")),
+    )
+    upvotes: int = Field(
+        default=0,
+        sa_column=Column(pg.INTEGER, nullable=False, server_default=text("0")),
+    )
+    downvotes: int = Field(
+        default=0,
+        sa_column=Column(pg.INTEGER, nullable=False, server_default=text("0")),
+    )
+    comment_count: int = Field(
+        default=0,
+        sa_column=Column(pg.INTEGER, nullable=False, server_default=text("0")),
+    )
+    last_activity_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(pg.TIMESTAMP)
+    )
+
+
+# Side effects written in the same transaction as the change that
+# triggers them, and relayed to the task backend by src.outbox
+class Outbox(SQLModel, table=True):
+    id: Optional[int] = Field(
+        default=None, sa_column=Column(pg.BIGINT, primary_key=True)
+    )
+    topic: str
+    payload: dict = Field(sa_column=Column(pg.JSONB, nullable=False))
+    attempts: int = Field(
+        default=0,
+        sa_column=Column(pg.INTEGER, nullable=False, server_default=text("0")),
+    )
+    created_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            pg.TIMESTAMP,
+            nullable=False,
+            server_default=func.timezone("utc", func.now()),
+        ),
+    )
+    available_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(
+            pg.TIMESTAMP,
+            nullable=False,
+            server_default=func.timezone("utc", func.now()),
+        ),
+    )
+    __table_args__ = (Index("idx_outbox_available_at", "available_at"),)
 
 
 class IdeaCategoryAssociation(SQLModel, table=True):
@@ -55,6 +138,7 @@ class IdeaCategoryAssociation(SQLModel, table=True):
         sa_column=Column(pg.UUID, ForeignKey("idea.id"), primary_key=True)
     )
     category_id: int = Field(ForeignKey("category.id"), primary_key=True)
+    __table_args__ = (Index("idx_ideacategoryassociation_category_id", "category_id"),)
 
 
 class Category(SQLModel, table=True):
@@ -81,6 +165,11 @@ class Idea(SQLModel, table=True):
     created_at: datetime = Field(
         sa_column=Column(pg.TIMESTAMP, default=datetime.utcnow())
     )
+    # bumped on every vote and comment; drives the idea ETags
+    version: int = Field(
+        default=0,
+        sa_column=Column(pg.INTEGER, nullable=False, server_default=text("0")),
+    )
     creator: User = Relationship(back_populates="ideas")
     project: Project = Relationship(back_populates="ideas")
     categories: List["Category"] = Relationship(
@@ -103,6 +192,8 @@ class Idea(SQLModel, table=True):
     )
     __table_args__ = (
         Index("idx_idea_search_vector", "search_vector", postgresql_using="gin"),
+        Index("idx_idea_created_at", "created_at"),
+        Index("idx_idea_project_id_created_at", "project_id", "created_at"),
     )
 
 
@@ -119,6 +210,7 @@ class Comment(SQLModel, table=True):
     )
     user: User = Relationship(back_populates="comments")
     idea: Idea = Relationship(back_populates="comments")
+    __table_args__ = (Index("idx_comment_idea_id_created_at", "idea_id", "created_at"),)
 
 
 # Vote Model
@@ -132,3 +224,13 @@ class Vote(SQLModel, table=True):
 
     user: User = Relationship(back_populates="votes")
     idea: Idea = Relationship(back_populates="votes")
+    __table_args__ = (
+        # covers the up/down vote counts and the per-user vote flags
+        Index(
+            "idx_vote_idea_id_is_upvote",
+            "idea_id",
+            "is_upvote",
+            postgresql_include=["user_id"],
+        ),
+        Index("idx_vote_user_id_idea_id", "user_id", "idea_id"),
+    )
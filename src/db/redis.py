@@ -1,17 +1,219 @@
+from typing import Optional
+
 import redis.asyncio as aioredis
 
 from src.config import Config
+from src.metrics.collectors import redis_timer
 
 JTI_EXPIRY = 3600
+PROJECTS_GENERATION_KEY = "projects:generation"
+EMAIL_QUEUE_KEY = "mail:queue"
+EMAIL_FLUSH_KEY = "mail:flush-scheduled"
+# payloads being sent, scored by when they were claimed
+EMAIL_PROCESSING_KEY = "mail:processing"
+TASK_STATE_EXPIRY = 86400
 
 token_blocklist = aioredis.from_url(Config.REDIS_URL)
 
 
 async def add_jti_to_blocklist(jti: str) -> None:
-    await token_blocklist.set(name=jti, value="", ex=JTI_EXPIRY)
+    async with redis_timer("set"):
+        await token_blocklist.set(name=jti, value="", ex=JTI_EXPIRY)
 
 
 async def token_in_blocklist(jti: str) -> bool:
-    jti = await token_blocklist.get(jti)
+    async with redis_timer("get"):
+        jti = await token_blocklist.get(jti)
 
     return jti is not None
+
+
+async def get_projects_generation() -> int:
+    async with redis_timer("get"):
+        generation = await token_blocklist.get(PROJECTS_GENERATION_KEY)
+
+    return int(generation or 0)
+
+
+async def bump_projects_generation() -> int:
+    async with redis_timer("incr"):
+        return await token_blocklist.incr(PROJECTS_GENERATION_KEY)
+
+
+async def push_emails(*payloads: str) -> None:
+    async with redis_timer("rpush"):
+        await token_blocklist.rpush(EMAIL_QUEUE_KEY, *payloads)
+
+
+async def email_queue_length() -> int:
+    async with redis_timer("llen"):
+        return await token_blocklist.llen(EMAIL_QUEUE_KEY)
+
+
+# Pop up to ARGV[1] payloads and record them as in flight in one step, so a
+# worker that dies mid-send leaves them in mail:processing rather than
+# losing them.
+CLAIM_EMAILS_SCRIPT = token_blocklist.register_script("""
+local payloads = redis.call('LPOP', KEYS[1], ARGV[1])
+if not payloads then
+    return {}
+end
+local now = redis.call('TIME')[1]
+for _, payload in ipairs(payloads) do
+    redis.call('ZADD', KEYS[2], now, payload)
+end
+return payloads
+""")
+
+# Put claimed payloads back on the queue. ARGV holds pairs of a claimed
+# payload and what to queue in its place; an empty replacement drops it.
+# Payloads no longer in mail:processing were already handled and are
+# skipped.
+REQUEUE_EMAILS_SCRIPT = token_blocklist.register_script("""
+local requeued = 0
+for i = 1, #ARGV, 2 do
+    if redis.call('ZREM', KEYS[1], ARGV[i]) == 1 and ARGV[i + 1] ~= '' then
+        redis.call('RPUSH', KEYS[2], ARGV[i + 1])
+        requeued = requeued + 1
+    end
+end
+return requeued
+""")
+
+
+async def claim_emails(count: int) -> list:
+    async with redis_timer("evalsha"):
+        return await CLAIM_EMAILS_SCRIPT(
+            keys=[EMAIL_QUEUE_KEY, EMAIL_PROCESSING_KEY], args=[count]
+        )
+
+
+async def finish_emails(payloads: list, retries: list) -> None:
+    """Drop handled payloads from mail:processing and queue their retries."""
+    async with redis_timer("multi"):
+        async with token_blocklist.pipeline(transaction=True) as pipe:
+            pipe.zrem(EMAIL_PROCESSING_KEY, *payloads)
+            if retries:
+                pipe.rpush(EMAIL_QUEUE_KEY, *retries)
+            await pipe.execute()
+
+
+async def requeue_emails(replacements: dict) -> int:
+    """Swap claimed payloads for their replacements, or drop them on None."""
+    args = []
+    for payload, replacement in replacements.items():
+        args += [payload, replacement or ""]
+    async with redis_timer("evalsha"):
+        return await REQUEUE_EMAILS_SCRIPT(
+            keys=[EMAIL_PROCESSING_KEY, EMAIL_QUEUE_KEY], args=args
+        )
+
+
+async def stale_emails(older_than: int) -> list:
+    """Payloads claimed by a worker that never finished them."""
+    async with redis_timer("time"):
+        now, _ = await token_blocklist.time()
+    async with redis_timer("zrangebyscore"):
+        return await token_blocklist.zrangebyscore(
+            EMAIL_PROCESSING_KEY, "-inf", now - older_than
+        )
+
+
+async def claim_email_flush(ttl: int) -> bool:
+    """True for the first caller since the last flush started."""
+    async with redis_timer("set"):
+        return bool(await token_blocklist.set(EMAIL_FLUSH_KEY, "", nx=True, ex=ttl))
+
+
+async def release_email_flush() -> None:
+    async with redis_timer("delete"):
+        await token_blocklist.delete(EMAIL_FLUSH_KEY)
+
+
+async def claim_idempotency_key(key: str, value: str, ttl: int) -> bool:
+    async with redis_timer("set"):
+        return bool(await token_blocklist.set(key, value, nx=True, ex=ttl))
+
+
+async def get_idempotency_record(key: str) -> Optional[str]:
+    async with redis_timer("get"):
+        return await token_blocklist.get(key)
+
+
+async def store_idempotency_record(key: str, value: str, ttl: int) -> None:
+    async with redis_timer("set"):
+        await token_blocklist.set(key, value, ex=ttl)
+
+
+async def release_idempotency_key(key: str) -> None:
+    async with redis_timer("delete"):
+        await token_blocklist.delete(key)
+
+
+async def store_task_state(task_id: str, value: str) -> None:
+    async with redis_timer("set"):
+        await token_blocklist.set(f"task:{task_id}", value, ex=TASK_STATE_EXPIRY)
+
+
+async def get_task_state(task_id: str) -> Optional[str]:
+    async with redis_timer("get"):
+        return await token_blocklist.get(f"task:{task_id}")
+
+
+# Token bucket in one round trip. Tokens already spent through the local
+# pre-check arrive as ARGV[3] and are always charged, so the bucket can go
+# negative; the request itself then needs one whole token. Time comes from
+# Redis so every worker shares one clock.
+TAKE_TOKEN_SCRIPT = token_blocklist.register_script("""
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local debt = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - at) * rate) - debt
+
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+""")
+
+
+async def take_token(key: str, rate: float, burst: int, debt: int = 0) -> tuple:
+    """(allowed, tokens left, seconds until one is available)."""
+    async with redis_timer("evalsha"):
+        allowed, tokens, retry_after = await TAKE_TOKEN_SCRIPT(
+            keys=[key], args=[rate, burst, debt]
+        )
+    return bool(allowed), float(tokens), float(retry_after)
+
+
+async def acquire_flight_lock(key: str, ttl_ms: int) -> bool:
+    async with redis_timer("set"):
+        return bool(await token_blocklist.set(key, "", nx=True, px=ttl_ms))
+
+
+async def release_flight_lock(key: str) -> None:
+    async with redis_timer("delete"):
+        await token_blocklist.delete(key)
+
+
+async def store_flight_result(key: str, value: bytes, ttl_ms: int) -> None:
+    async with redis_timer("set"):
+        await token_blocklist.set(key, value, px=ttl_ms)
+
+
+async def get_flight_result(key: str) -> Optional[bytes]:
+    async with redis_timer("get"):
+        return await token_blocklist.get(key)
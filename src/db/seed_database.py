@@ -1,231 +1,411 @@
-import asyncio
-from sqlmodel import SQLModel
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime, timedelta
-import uuid
-import os
-import random
-from typing import List, Dict
-from models import Category, Idea, User, Project, Vote, Comment
-
-# Replace with your database URL
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-# Create async engine
-engine = create_async_engine(
-    DATABASE_URL, echo=True  # Set to False to disable SQL logging
-)
-
-# Create async session maker
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-
-
-def random_date():
-    days_back = random.randint(0, 365)
-    return datetime.utcnow() - timedelta(days=days_back)
-
-
-async def create_users_projects_categories() -> Dict[str, List]:
-    # Create categories with fixed IDs
-    categories = [
-        Category(id=1, name="AI/ML"),
-        Category(id=2, name="FrontEnd"),
-        Category(id=3, name="Backend"),
-        Category(id=4, name="FullStack"),
-        Category(id=5, name="Mobile"),
-        Category(id=6, name="GameDev"),
-        Category(id=7, name="DevOps"),
-        Category(id=8, name="Cloud"),
-        Category(id=9, name="DataScience"),
-        Category(id=10, name="Security"),
-        Category(id=11, name="IoT"),
-        Category(id=12, name="Blockchain"),
-        Category(id=13, name="AR/VR"),
-        Category(id=14, name="Other"),
-    ]
+"""Generate a production-sized dataset and bulk load it with COPY.
 
-    # Create 5 users with fixed UUIDs
-    user_ids = [uuid.uuid4() for _ in range(5)]
-    users = [
-        User(
-            id=user_id,
-            username=f"user{i}",
-            email=f"user{i}@example.com",
-            password_hash=f"hashed_password_{i}",
-            is_verified=True,
-            created_at=random_date(),
-        )
-        for i, user_id in enumerate(user_ids, 1)
-    ]
+Every parent row draws from its own RNG derived from ``--seed``, so the same
+arguments always produce the same rows regardless of batch size or how
+batches are scheduled across connections.
 
-    # Create 3 projects with fixed UUIDs
-    project_data = [
-        (
-            "FastAPI",
-            "A modern, fast web framework for building APIs with Python",
-            "https://fastapi.tiangolo.com",
-        ),
-        ("GIMP", "GNU Image Manipulation Program", "https://www.gimp.org"),
-        (
-            "Arch Linux",
-            "A lightweight and flexible Linux distribution",
-            "https://archlinux.org",
-        ),
-    ]
+    python -m src.db.seed_database --users 100000 --projects 200 \\
+        --ideas 1000000 --votes 10000000 --comments 2000000 --seed 42 --reset
+"""
 
-    project_ids = [uuid.uuid4() for _ in range(len(project_data))]
-    projects = [
-        Project(
-            id=project_id,
-            name=name,
-            description=desc,
-            url=url,
-            creator_id=random.choice(user_ids),
-            creted_at=random_date(),
+import argparse
+import asyncio
+import bisect
+import itertools
+import random
+import time
+import uuid
+from array import array
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Sequence
+
+import asyncpg
+from sqlalchemy.engine import make_url
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth.utils import generate_passwd_hash
+from src.config import Config
+from src.db.main import build_engine
+from src.projects.services import ProjectStatsService
+
+CATEGORIES = [
+    "AI/ML",
+    "FrontEnd",
+    "Backend",
+    "FullStack",
+    "Mobile",
+    "GameDev",
+    "DevOps",
+    "Cloud",
+    "DataScience",
+    "Security",
+    "IoT",
+    "Blockchain",
+    "AR/VR",
+    "Other",
+]
+
+VERBS = [
+    "Add",
+    "Implement",
+    "Improve",
+    "Refactor",
+    "Support",
+    "Optimize",
+    "Document",
+    "Redesign",
+    "Automate",
+    "Remove",
+]
+
+NOUNS = [
+    "OAuth2 login",
+    "dark mode",
+    "mobile app",
+    "search",
+    "dashboard",
+    "API docs",
+    "test suite",
+    "notifications",
+    "export to CSV",
+    "plugin system",
+    "offline mode",
+    "webhooks",
+    "caching layer",
+    "admin panel",
+    "rate limiting",
+]
+
+WORDS = (
+    "the a users would like to be able faster simple better support for "
+    "when with without new old page list view settings option button error "
+    "performance issue feature request idea it this that because so"
+).split()
+
+# every user gets the same password so the dataset can be logged into
+SEED_PASSWORD = "password123"
+
+TIMELINE_START = datetime(2024, 1, 1)
+TIMELINE_DAYS = 365
+
+TABLES = [
+    "vote",
+    "comment",
+    "ideacategoryassociation",
+    "idea",
+    "project",
+    "category",
+    '"user"',
+]
+
+
+def row_rng(seed: int, table: str, index: int) -> random.Random:
+    return random.Random(f"{seed}:{table}:{index}")
+
+
+def entity_id(seed: int, kind: str, index: int) -> uuid.UUID:
+    return uuid.uuid5(uuid.NAMESPACE_OID, f"{seed}:{kind}:{index}")
+
+
+def zipf_cum_weights(n: int, exponent: float, rng: random.Random) -> List[float]:
+    """Cumulative Zipf weights over ``n`` items in a shuffled rank order."""
+    ranks = list(range(1, n + 1))
+    rng.shuffle(ranks)
+    return list(itertools.accumulate(1.0 / rank**exponent for rank in ranks))
+
+
+def zipf_counts(
+    total: int, n: int, exponent: float, cap: int, rng: random.Random
+) -> array:
+    """Split ``total`` into ``n`` Zipf-skewed counts, each at most ``cap``."""
+    cum_weights = zipf_cum_weights(n, exponent, rng)
+    weight_sum = cum_weights[-1]
+    counts = array("l", [0] * n)
+    previous = 0.0
+    for i, cum_weight in enumerate(cum_weights):
+        counts[i] = min(cap, int(total * (cum_weight - previous) / weight_sum))
+        previous = cum_weight
+
+    # hand out the rounding remainder to random items that still have room
+    remainder = total - sum(counts)
+    attempts = 0
+    while remainder > 0 and attempts < total * 4:
+        i = rng.randrange(n)
+        if counts[i] < cap:
+            counts[i] += 1
+            remainder -= 1
+        attempts += 1
+    return counts
+
+
+def pick(rng: random.Random, cum_weights: Sequence[float]) -> int:
+    return bisect.bisect_left(cum_weights, rng.random() * cum_weights[-1])
+
+
+class BurstyClock:
+    """Timestamps clustered around bursts of activity.
+
+    Bursts are spread over the timeline and events land a short,
+    exponentially distributed time after a burst starts, which mimics
+    launches and links from popular sites.
+    """
+
+    def __init__(self, rng: random.Random, bursts: int = 120):
+        self.starts = sorted(
+            rng.random() * TIMELINE_DAYS * 86400 for _ in range(bursts)
         )
-        for (name, desc, url), project_id in zip(project_data, project_ids)
-    ]
-
-    return {
-        "categories": categories,
-        "users": users,
-        "projects": projects,
-        "user_ids": user_ids,
-        "project_ids": project_ids,
-    }
-
-
-async def create_ideas(
-    user_ids: List[uuid.UUID], project_ids: List[uuid.UUID], categories: List[Category]
-) -> List[Idea]:
-    # Create 10 ideas
-    idea_titles = [
-        "Add OAuth2 Support",
-        "Implement Dark Mode",
-        "Mobile App Integration",
-        "Performance Optimization",
-        "Cloud Deployment Tools",
-        "Security Enhancements",
-        "User Dashboard",
-        "API Documentation",
-        "Automated Testing",
-        "Community Features",
-    ]
+        self.cum_weights = zipf_cum_weights(bursts, 0.8, rng)
 
-    idea_ids = [uuid.uuid4() for _ in range(len(idea_titles))]
-    ideas = []
-
-    for idea_id, title in zip(idea_ids, idea_titles):
-        idea = Idea(
-            id=idea_id,
-            title=title,
-            description=f"Detailed description for {title}",
-            project_id=random.choice(project_ids),
-            creator_id=random.choice(user_ids),
-            created_at=random_date(),
-        )
-        idea.categories = random.sample(categories, random.randint(2, 3))
-        ideas.append(idea)
-
-    return ideas
-
-
-async def create_votes_comments(
-    user_ids: List[uuid.UUID], idea_ids: List[uuid.UUID]
-) -> Dict[str, List]:
-    # Create 10 comments
-    comments = [
-        Comment(
-            id=uuid.uuid4(),
-            content=f"This is comment {i} on the idea",
-            user_id=random.choice(user_ids),
-            idea_id=random.choice(idea_ids),
-            created_at=random_date(),
-        )
-        for i in range(1, 11)
-    ]
+    def offset(self, rng: random.Random) -> float:
+        start = self.starts[pick(rng, self.cum_weights)]
+        return min(start + rng.expovariate(1 / 21600), TIMELINE_DAYS * 86400)
 
-    # Create 20 votes
-    votes = []
-    for _ in range(20):
-        idea_id = random.choice(idea_ids)
-        user_id = random.choice(user_ids)
-        is_upvote = random.choice([True, True, True, False])  # 75% chance of upvote
 
-        vote = Vote(
-            id=uuid.uuid4(), user_id=user_id, idea_id=idea_id, is_upvote=is_upvote
-        )
-        votes.append(vote)
+def to_datetime(offset: float) -> datetime:
+    return TIMELINE_START + timedelta(seconds=offset)
 
-    return {
-        "comments": comments,
-        "votes": votes,
-    }
 
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words)).capitalize() + "."
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.drop_all)
-        await conn.run_sync(SQLModel.metadata.create_all)
 
+class DatasetGenerator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.seed = args.seed
+        rng = random.Random(args.seed)
 
-async def main():
-    # Initialize database
-    await init_db()
+        self.password_hash = generate_passwd_hash(SEED_PASSWORD)
+        self.clock = BurstyClock(rng)
+        self.idea_times = array(
+            "d", (self.clock.offset(rng) for _ in range(args.ideas))
+        )
+        # a few power users create most of the content
+        self.creator_weights = zipf_cum_weights(args.users, 1.1, rng)
+        self.project_weights = zipf_cum_weights(args.projects, 1.0, rng)
+        self.votes_per_idea = zipf_counts(args.votes, args.ideas, 1.1, args.users, rng)
+        self.comments_per_idea = zipf_counts(
+            args.comments, args.ideas, 1.2, args.comments, rng
+        )
 
-    # Create users, projects, and categories
-    data = await create_users_projects_categories()
+    def user_id(self, index: int) -> uuid.UUID:
+        return entity_id(self.seed, "user", index)
+
+    def project_id(self, index: int) -> uuid.UUID:
+        return entity_id(self.seed, "project", index)
+
+    def idea_id(self, index: int) -> uuid.UUID:
+        return entity_id(self.seed, "idea", index)
+
+    def categories(self, start: int, stop: int) -> Iterable[tuple]:
+        for index, name in enumerate(CATEGORIES[start:stop], start + 1):
+            yield (index, name)
+
+    def users(self, start: int, stop: int) -> Iterable[tuple]:
+        for i in range(start, stop):
+            rng = row_rng(self.seed, "user", i)
+            yield (
+                self.user_id(i),
+                f"user{i}",
+                f"user{i}@example.com",
+                to_datetime(rng.random() * TIMELINE_DAYS * 86400),
+                True,
+                self.password_hash,
+            )
+
+    def projects(self, start: int, stop: int) -> Iterable[tuple]:
+        for i in range(start, stop):
+            rng = row_rng(self.seed, "project", i)
+            yield (
+                self.project_id(i),
+                f"project-{i}",
+                sentence(rng, 12),
+                f"https://example.com/project-{i}",
+                self.user_id(pick(rng, self.creator_weights)),
+                to_datetime(rng.random() * TIMELINE_DAYS * 86400),
+            )
+
+    def ideas(self, start: int, stop: int) -> Iterable[tuple]:
+        for i in range(start, stop):
+            rng = row_rng(self.seed, "idea", i)
+            yield (
+                self.idea_id(i),
+                f"{rng.choice(VERBS)} {rng.choice(NOUNS)}",
+                " ".join(sentence(rng, rng.randint(8, 20)) for _ in range(3)),
+                self.project_id(pick(rng, self.project_weights)),
+                self.user_id(pick(rng, self.creator_weights)),
+                to_datetime(self.idea_times[i]),
+            )
+
+    def idea_categories(self, start: int, stop: int) -> Iterable[tuple]:
+        for i in range(start, stop):
+            rng = row_rng(self.seed, "ideacategoryassociation", i)
+            idea_id = self.idea_id(i)
+            for category_id in rng.sample(range(1, len(CATEGORIES) + 1), 3)[
+                : rng.randint(1, 3)
+            ]:
+                yield (idea_id, category_id)
+
+    def comments(self, start: int, stop: int) -> Iterable[tuple]:
+        for i in range(start, stop):
+            rng = row_rng(self.seed, "comment", i)
+            idea_id = self.idea_id(i)
+            created = self.idea_times[i]
+            for _ in range(self.comments_per_idea[i]):
+                yield (
+                    uuid.UUID(int=rng.getrandbits(128), version=4),
+                    sentence(rng, rng.randint(4, 30)),
+                    self.user_id(pick(rng, self.creator_weights)),
+                    idea_id,
+                    to_datetime(created + rng.expovariate(1 / 172800)),
+                )
+
+    def votes(self, start: int, stop: int) -> Iterable[tuple]:
+        for i in range(start, stop):
+            rng = row_rng(self.seed, "vote", i)
+            idea_id = self.idea_id(i)
+            # one vote per user per idea, matching what handle_vote allows
+            for user_index in rng.sample(
+                range(self.args.users), self.votes_per_idea[i]
+            ):
+                yield (
+                    uuid.UUID(int=rng.getrandbits(128), version=4),
+                    self.user_id(user_index),
+                    idea_id,
+                    rng.random() < 0.75,
+                )
+
+
+def asyncpg_dsn(url: str) -> str:
+    return (
+        make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+    )
 
-    # Insert categories first
-    async with async_session() as session:
-        for category in data["categories"]:
-            session.add(category)
-        await session.commit()
 
-        # Insert users
-        for user in data["users"]:
-            session.add(user)
+async def copy_table(
+    pool: asyncpg.Pool,
+    table: str,
+    columns: List[str],
+    rows: Callable[[int, int], Iterable[tuple]],
+    total: int,
+    batch_size: int,
+) -> int:
+    started = time.perf_counter()
+    # each worker holds one connection and generates its next batch only
+    # once it has it, so at most pool-size batches are in memory at a time;
+    # generation runs in a thread so other workers' COPYs keep streaming
+    starts = iter(range(0, total, batch_size))
+
+    async def worker() -> int:
+        loaded = 0
+        async with pool.acquire() as conn:
+            for start in starts:
+                stop = min(start + batch_size, total)
+                records = await asyncio.to_thread(lambda: list(rows(start, stop)))
+                await conn.copy_records_to_table(
+                    table, records=records, columns=columns
+                )
+                loaded += len(records)
+        return loaded
+
+    counts = await asyncio.gather(*(worker() for _ in range(pool.get_max_size())))
+    loaded = sum(counts)
+    print(f"Loaded {loaded} rows into {table} in {time.perf_counter() - started:.1f}s")
+    return loaded
+
+
+async def rebuild_project_stats(database_url: str) -> None:
+    # COPY bypasses the services that keep project_stats current
+    started = time.perf_counter()
+    engine = build_engine(url=database_url)
+    async with AsyncSession(engine) as session:
+        await ProjectStatsService().rebuild(session)
         await session.commit()
+    await engine.dispose()
+    print(f"Rebuilt project_stats in {time.perf_counter() - started:.1f}s")
 
-        # Insert projects
-        for project in data["projects"]:
-            session.add(project)
-        await session.commit()
 
-    # Create ideas
-    ideas = await create_ideas(
-        data["user_ids"], data["project_ids"], data["categories"]
+async def main(args: argparse.Namespace) -> None:
+    generator = DatasetGenerator(args)
+    pool = await asyncpg.create_pool(
+        asyncpg_dsn(args.database_url), min_size=args.workers, max_size=args.workers
     )
 
-    # Insert ideas
-    async with async_session() as session:
-        for idea in ideas:
-            session.add(idea)
-        await session.commit()
-
-    # Create votes and comments
-    idea_ids = [idea.id for idea in ideas]
-    votes_comments = await create_votes_comments(data["user_ids"], idea_ids)
-
-    # Insert comments
-    async with async_session() as session:
-        for comment in votes_comments["comments"]:
-            session.add(comment)
-        await session.commit()
-
-        # Insert votes
-        for vote in votes_comments["votes"]:
-            session.add(vote)
-        await session.commit()
+    if args.reset:
+        async with pool.acquire() as conn:
+            await conn.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
 
-        print("\nData insertion completed successfully!")
-        print(f"Created {len(data['users'])} users")
-        print(f"Created {len(data['projects'])} projects")
-        print(f"Created {len(ideas)} ideas")
-        print(f"Created {len(votes_comments['comments'])} comments")
-        print(f"Created {len(votes_comments['votes'])} votes")
+    # parents first so foreign keys are satisfied; batches within a table
+    # run in parallel across the pool
+    plan = [
+        ("category", ["id", "name"], generator.categories, len(CATEGORIES)),
+        (
+            "user",
+            ["id", "username", "email", "created_at", "is_verified", "password_hash"],
+            generator.users,
+            args.users,
+        ),
+        (
+            "project",
+            ["id", "name", "description", "url", "creator_id", "creted_at"],
+            generator.projects,
+            args.projects,
+        ),
+        (
+            "idea",
+            ["id", "title", "description", "project_id", "creator_id", "created_at"],
+            generator.ideas,
+            args.ideas,
+        ),
+        (
+            "ideacategoryassociation",
+            ["idea_id", "category_id"],
+            generator.idea_categories,
+            args.ideas,
+        ),
+        (
+            "comment",
+            ["id", "content", "user_id", "idea_id", "created_at"],
+            generator.comments,
+            args.ideas,
+        ),
+        (
+            "vote",
+            ["id", "user_id", "idea_id", "is_upvote"],
+            generator.votes,
+            args.ideas,
+        ),
+    ]
+    for table, columns, rows, total in plan:
+        await copy_table(pool, table, columns, rows, total, args.batch_size)
+    await rebuild_project_stats(args.database_url)
+
+    async with pool.acquire() as conn:
+        await conn.execute("ANALYZE")
+    await pool.close()
+
+    print("\nData insertion completed successfully!")
+    print(f"Users can log in with password '{SEED_PASSWORD}'")
+
+
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--ideas", type=int, default=10000)
+    parser.add_argument("--votes", type=int, default=100000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--batch-size", type=int, default=2000, help="parent rows per COPY batch"
+    )
+    parser.add_argument("--workers", type=int, default=4, help="parallel connections")
+    parser.add_argument(
+        "--reset", action="store_true", help="truncate all tables before loading"
+    )
+    parser.add_argument("--database-url", default=Config.DATABASE_URL)
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
@@ -1,6 +1,18 @@
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi.requests import Request
 from sqlalchemy.types import TypeDecorator, String
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import datetime
 
+from src.db.main import cancel_backend
+from src.errors import ClientDisconnected
+
+T = TypeVar("T")
+
+DISCONNECT_POLL_INTERVAL = 0.1
+
 
 class DateTimeString(TypeDecorator):
     impl = String
@@ -14,3 +26,35 @@ class DateTimeString(TypeDecorator):
         if value is not None:
             return datetime.fromisoformat(value)
         return value
+
+
+async def cancel_on_disconnect(
+    request: Request, session: AsyncSession, awaitable: Awaitable[T]
+) -> T:
+    """Await ``awaitable``, cancelling its query if the client goes away first.
+
+    Postgres does not notice a dropped client until it next talks to it, so
+    the running statement is cancelled server-side with ``pg_cancel_backend``
+    using the pid recorded by ``statement_timeout``.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                break
+
+        backend_pid = session.info.get("backend_pid")
+        if backend_pid is not None:
+            await cancel_backend(backend_pid)
+            # let the cancelled statement fail so the connection stays usable
+            await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL * 10)
+        raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # the outcome is irrelevant once the client is gone
+            task.exception()
@@ -1,9 +1,13 @@
+import math
 from typing import Any, Callable
 
 from fastapi import FastAPI, status
 from fastapi.requests import Request
 from fastapi.responses import JSONResponse
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+QUERY_CANCELED_SQLSTATE = "57014"
 
 
 class IdeaBoardException(Exception):
@@ -96,6 +100,32 @@ class CommentNotFound(IdeaBoardException):
     pass
 
 
+class ClientDisconnected(IdeaBoardException):
+    """Client went away before the response was ready"""
+
+    pass
+
+
+class TaskQueueFull(IdeaBoardException):
+    """The in-process task queue has no room for another job"""
+
+    pass
+
+
+class SharedLoadFailed(IdeaBoardException):
+    """Another worker's load of a shared result failed"""
+
+    pass
+
+
+class RateLimitExceeded(IdeaBoardException):
+    """Client has used up its request budget for a route"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
 class AccountNotVerified(Exception):
     """Account not yet verified"""
 
@@ -272,6 +302,62 @@ def register_all_errors(app: FastAPI):
         ),
     )
 
+    app.add_exception_handler(
+        ClientDisconnected,
+        create_exception_handler(
+            status_code=499,
+            initial_detail={
+                "message": "Client closed request",
+                "error_code": "client_disconnected",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        TaskQueueFull,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "The service is busy, please try again shortly",
+                "error_code": "task_queue_full",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        SharedLoadFailed,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "The service is busy, please try again shortly",
+                "error_code": "shared_load_failed",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        PoolTimeoutError,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "The service is busy, please try again shortly",
+                "error_code": "database_busy",
+            },
+        ),
+    )
+
+    @app.exception_handler(RateLimitExceeded)
+    async def rate_limit_exceeded(request, exc: RateLimitExceeded):
+
+        return JSONResponse(
+            content={
+                "message": "Too many requests, please slow down",
+                "error_code": "rate_limited",
+            },
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
+
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
 
@@ -285,6 +371,17 @@ def register_all_errors(app: FastAPI):
 
     @app.exception_handler(SQLAlchemyError)
     async def database__error(request, exc):
+        if (
+            isinstance(exc, DBAPIError)
+            and getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED_SQLSTATE
+        ):
+            return JSONResponse(
+                content={
+                    "message": "The request took too long to process",
+                    "error_code": "query_timeout",
+                },
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            )
         print(str(exc))
         return JSONResponse(
             content={
@@ -0,0 +1,52 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from src.config import Config
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the cheap version values a response depends on."""
+    digest = hashlib.blake2b(
+        ":".join(str(part) for part in parts).encode(), digest_size=16
+    )
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/ prefixes (added by
+    # CompressionMiddleware or a CDN) still match
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def cache_control(anonymous: bool) -> str:
+    # anonymous bodies are identical for everyone, so shared caches may keep
+    # them briefly; personalised ones must always be revalidated
+    if anonymous:
+        return (
+            f"public, max-age={Config.HTTP_CACHE_MAX_AGE}, "
+            f"s-maxage={Config.HTTP_CACHE_S_MAXAGE}"
+        )
+    return "private, no-cache"
+
+
+def set_cache_headers(response: Response, etag: str, anonymous: bool) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control(anonymous)
+    response.headers["Vary"] = "Authorization"
+
+
+def not_modified(request: Request, etag: str, anonymous: bool) -> Optional[Response]:
+    """A 304 response if the client already holds ``etag``, else None."""
+    if not etag_matches(request, etag):
+        return None
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, anonymous)
+    return response
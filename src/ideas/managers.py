@@ -2,6 +2,8 @@ from typing import Dict, Set, Optional
 from fastapi import WebSocket, WebSocketDisconnect
 import uuid
 
+from src.metrics.collectors import WEBSOCKET_CONNECTIONS
+
 
 # WebSocket connection manager
 class VoteConnectionManager:
@@ -14,9 +16,11 @@ class VoteConnectionManager:
         if idea_id not in self.active_connections:
             self.active_connections[idea_id] = set()
         self.active_connections[idea_id].add(websocket)
+        WEBSOCKET_CONNECTIONS.inc()
 
     def disconnect(self, websocket: WebSocket, idea_id: uuid.UUID):
         self.active_connections[idea_id].remove(websocket)
+        WEBSOCKET_CONNECTIONS.dec()
         if not self.active_connections[idea_id]:
             del self.active_connections[idea_id]
 
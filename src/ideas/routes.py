@@ -1,8 +1,11 @@
 from typing import List, Optional, Tuple
 import uuid
+import orjson
 from fastapi import WebSocket, WebSocketDisconnect
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from src.responses import ORJSONResponse
 from fastapi.param_functions import Depends
+from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.dependencies import (
     AccessTokenBearer,
@@ -13,16 +16,27 @@ from src.errors import IdeaIdMismatch, IdeaNotFound, InvalidCredentials, UserNot
 from src.ideas.managers import VoteConnectionManager
 from .services import IdeaService
 from .schemas import (
+    IdeaBatchGetModel,
     IdeaCreationModel,
     IdeaSearchParams,
     VoteCreationModel,
     CommentCreationModel,
 )
-from src.db.main import get_session
+from src.config import Config
+from src.db.main import apply_statement_timeout, async_session_maker, get_session
+from src.db.utils import cancel_on_disconnect
+from src.http_cache import make_etag, not_modified, set_cache_headers
+from src.rate_limit import rate_limit
+from src.single_flight import SingleFlight
 
 idea_router = APIRouter()
+# Google-style custom method on the collection, which the prefixed
+# idea_router cannot express
+idea_batch_router = APIRouter()
 idea_service = IdeaService()
 vote_manager = VoteConnectionManager()
+search_flights = SingleFlight("ideas:search")
+detail_flights = SingleFlight("ideas:detail")
 
 
 @idea_router.post("/")
@@ -39,34 +53,138 @@ async def create_idea(
     return idea
 
 
+def search_flight_key(params: IdeaSearchParams) -> str:
+    # parsed params, so equivalent query strings share a key
+    return orjson.dumps(params.model_dump(), option=orjson.OPT_SORT_KEYS).decode()
+
+
 @idea_router.get("/")
 async def search_ideas_route(
+    request: Request,
     params: IdeaSearchParams = Depends(),
     current_user: Optional[User] = Depends(get_optional_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    ideas, next_cursor = await idea_service.search_ideas(
-        session, params, current_user.id if current_user else None
+    if current_user is None:
+        # identical for every anonymous caller, so concurrent ones share
+        # one query on a session of its own
+        async def load() -> dict:
+            async with async_session_maker() as flight_session:
+                await apply_statement_timeout(
+                    flight_session, Config.DB_SEARCH_STATEMENT_TIMEOUT_MS
+                )
+                ideas, next_cursor = await idea_service.search_ideas(
+                    flight_session, params, None
+                )
+            return {
+                "items": ideas,
+                "next_cursor": str(next_cursor) if next_cursor else None,
+            }
+
+        page = await cancel_on_disconnect(
+            request, session, search_flights.do(search_flight_key(params), load)
+        )
+        return ORJSONResponse(page)
+
+    await apply_statement_timeout(session, Config.DB_SEARCH_STATEMENT_TIMEOUT_MS)
+    ideas, next_cursor = await cancel_on_disconnect(
+        request,
+        session,
+        idea_service.search_ideas(session, params, current_user.id),
+    )
+    # returned directly so FastAPI skips jsonable_encoder; orjson handles the
+    # UUIDs and datetimes natively
+    return ORJSONResponse(
+        {"items": ideas, "next_cursor": str(next_cursor) if next_cursor else None}
     )
-    return {"items": ideas, "next_cursor": str(next_cursor) if next_cursor else None}
 
 
 @idea_router.get("/{idea_id}")
 async def get_idea_by_id(
+    request: Request,
     idea_id: uuid.UUID,
     current_user: Optional[User] = Depends(get_optional_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    print(current_user)
-    idea = await idea_service.get_idea_by_id(
-        idea_id, session, current_user.id if current_user else None
-    )
+    anonymous = current_user is None
+    user_id = None if anonymous else current_user.id
+    await apply_statement_timeout(session, Config.DB_DETAIL_STATEMENT_TIMEOUT_MS)
+    # answer revalidations from the version column before the aggregate query
+    version = await idea_service.get_idea_detail_version(idea_id, session)
+    if version is None:
+        raise IdeaNotFound
+    etag = make_etag("idea", idea_id, *version, user_id)
+    cached = not_modified(request, etag, anonymous)
+    if cached:
+        return cached
+
+    if anonymous:
+        # the body is shared by concurrent anonymous callers; keyed by the
+        # ETag so a flight never serves a body older than its version
+        async def load() -> Optional[dict]:
+            async with async_session_maker() as flight_session:
+                await apply_statement_timeout(
+                    flight_session, Config.DB_DETAIL_STATEMENT_TIMEOUT_MS
+                )
+                return await idea_service.get_idea_by_id(idea_id, flight_session, None)
+
+        idea = await cancel_on_disconnect(
+            request, session, detail_flights.do(etag, load)
+        )
+    else:
+        idea = await cancel_on_disconnect(
+            request, session, idea_service.get_idea_by_id(idea_id, session, user_id)
+        )
     if idea is None:
         raise IdeaNotFound
-    return idea
+    response = ORJSONResponse(idea)
+    set_cache_headers(response, etag, anonymous)
+    return response
 
 
-@idea_router.post("/{idea_id}/comment")
+@idea_batch_router.post("/ideas:batchGet")
+async def batch_get_ideas(
+    request: Request,
+    batch: IdeaBatchGetModel,
+    current_user: Optional[User] = Depends(get_optional_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Ideas for up to IDEA_BATCH_GET_MAX ids, in the order asked, with the
+    same shape as GET /ideas/{id}; null for ids that do not exist.
+
+    ``items`` has one entry per requested id, so repeated ids repeat, but
+    each idea is only loaded once. Each idea carries only its
+    IDEA_BATCH_GET_COMMENTS newest comments, with the full
+    ``comments_count``.
+    """
+    await apply_statement_timeout(session, Config.DB_DETAIL_STATEMENT_TIMEOUT_MS)
+    idea_ids = list(dict.fromkeys(batch.ids))
+    ideas = await cancel_on_disconnect(
+        request,
+        session,
+        idea_service.get_ideas_by_ids(
+            idea_ids,
+            session,
+            current_user.id if current_user else None,
+            comment_limit=Config.IDEA_BATCH_GET_COMMENTS,
+        ),
+    )
+    by_id = dict(zip(idea_ids, ideas))
+    return ORJSONResponse({"items": [by_id[idea_id] for idea_id in batch.ids]})
+
+
+@idea_router.post(
+    "/{idea_id}/comment",
+    dependencies=[
+        Depends(
+            rate_limit(
+                "comments",
+                Config.RATE_LIMIT_COMMENTS_PER_MINUTE,
+                Config.RATE_LIMIT_COMMENTS_BURST,
+            )
+        )
+    ],
+)
 async def make_comment(
     idea_id: uuid.UUID,
     comment_data: CommentCreationModel,
@@ -82,15 +200,13 @@ async def make_comment(
 
 
 @idea_router.websocket("/{idea_id}/votes/ws")
-async def vote_websocket(
-    websocket: WebSocket,
-    idea_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
-):
+async def vote_websocket(websocket: WebSocket, idea_id: uuid.UUID):
     await vote_manager.connect(websocket, idea_id)
     try:
-        # Send initial vote counts
-        initial_counts = await idea_service.get_vote_counts(idea_id, session)
+        # Send initial vote counts, releasing the connection straight away so
+        # long-lived sockets don't hold the pool
+        async with async_session_maker() as session:
+            initial_counts = await idea_service.get_vote_counts(idea_id, session)
         await websocket.send_json(initial_counts)
 
         # Keep connection alive and handle any client messages
@@ -105,7 +221,18 @@ async def vote_websocket(
         raise
 
 
-@idea_router.post("/{idea_id}/votes")
+@idea_router.post(
+    "/{idea_id}/votes",
+    dependencies=[
+        Depends(
+            rate_limit(
+                "votes",
+                Config.RATE_LIMIT_VOTES_PER_MINUTE,
+                Config.RATE_LIMIT_VOTES_BURST,
+            )
+        )
+    ],
+)
 async def vote(
     idea_id: uuid.UUID,
     vote_data: VoteCreationModel,
@@ -131,13 +258,32 @@ async def vote(
 
         print(updated_counts)
         return updated_counts
+    except SQLAlchemyError:
+        # statement timeouts and pool exhaustion map to 504/503, which
+        # clients may retry
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @idea_router.get("/{idea_id}/votes")
-async def get_votes(idea_id: uuid.UUID, session: AsyncSession = Depends(get_session)):
-    return await idea_service.get_vote_counts(idea_id, session)
+async def get_votes(
+    request: Request,
+    response: Response,
+    idea_id: uuid.UUID,
+    session: AsyncSession = Depends(get_session),
+):
+    version = await idea_service.get_idea_version(idea_id, session)
+    if version is None:
+        raise IdeaNotFound
+    etag = make_etag("votes", idea_id, version)
+    cached = not_modified(request, etag, anonymous=True)
+    if cached:
+        return cached
+
+    counts = await idea_service.get_vote_counts(idea_id, session)
+    set_cache_headers(response, etag, anonymous=True)
+    return counts
 
 
 @idea_router.delete("/{idea_id}/votes")
@@ -1,8 +1,10 @@
 from datetime import datetime
 import uuid
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
+from src.config import Config
+
 
 class IdeaCreationModel(BaseModel):
     title: str
@@ -18,6 +20,10 @@ class CommentCreationModel(BaseModel):
     idea_id: uuid.UUID
 
 
+class IdeaBatchGetModel(BaseModel):
+    ids: List[uuid.UUID] = Field(min_length=1, max_length=Config.IDEA_BATCH_GET_MAX)
+
+
 class VoteCreationModel(BaseModel):
     is_upvote: bool
 
@@ -1,8 +1,11 @@
 from datetime import datetime
+import logging
 from typing import Dict, List, Optional, Tuple
 import uuid
 from fastapi import HTTPException
+from sqlalchemy import false, update
 from sqlalchemy.dialects.postgresql import array_agg
+from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import and_, desc, func, or_, select, case, distinct
 from sqlmodel.sql.expression import Select
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -22,6 +25,7 @@ from src.errors import (
     UserNotFound,
     VoteNotFound,
 )
+from src.projects.services import ProjectStatsService
 from src.ideas.schemas import (
     CommentCreationModel,
     IdeaCreationModel,
@@ -29,8 +33,86 @@ from src.ideas.schemas import (
     VoteCreationModel,
 )
 
+logger = logging.getLogger(__name__)
+
+
+def vote_count_subquery(is_upvote: bool):
+    # correlated per idea so the count is served by idx_vote_idea_id_is_upvote
+    # instead of aggregating the whole vote table
+    return (
+        select(func.count(Vote.id))
+        .where(Vote.idea_id == Idea.id, Vote.is_upvote.is_(is_upvote))
+        .correlate(Idea)
+        .scalar_subquery()
+    )
+
+
+def user_voted_subquery(user_id: Optional[uuid.UUID], is_upvote: bool):
+    return (
+        select(Vote.id)
+        .where(
+            Vote.idea_id == Idea.id,
+            Vote.user_id == user_id,
+            Vote.is_upvote.is_(is_upvote),
+        )
+        .correlate(Idea)
+        .exists()
+    )
+
+
+def user_commented_subquery(user_id: Optional[uuid.UUID]):
+    return (
+        select(Comment.id)
+        .where(Comment.idea_id == Idea.id, Comment.user_id == user_id)
+        .correlate(Idea)
+        .exists()
+    )
+
+
+def category_names_subquery():
+    return (
+        select(array_agg(distinct(Category.name)))
+        .select_from(IdeaCategoryAssociation)
+        .join(Category, Category.id == IdeaCategoryAssociation.category_id)
+        .where(IdeaCategoryAssociation.idea_id == Idea.id)
+        .correlate(Idea)
+        .scalar_subquery()
+    )
+
+
+project_stats_service = ProjectStatsService()
+
+
+def vote_deltas(vote: Vote, delta: int) -> Dict[str, int]:
+    return {"upvotes": delta} if vote.is_upvote else {"downvotes": delta}
+
 
 class IdeaService:
+    async def get_idea_version(
+        self, idea_id: uuid.UUID, session: AsyncSession
+    ) -> Optional[int]:
+        result = await session.execute(select(Idea.version).where(Idea.id == idea_id))
+        return result.scalar_one_or_none()
+
+    async def get_idea_detail_version(
+        self, idea_id: uuid.UUID, session: AsyncSession
+    ) -> Optional[Tuple[int, Optional[datetime]]]:
+        # the detail body also shows the project's name, which a rename
+        # changes without touching the idea
+        result = await session.execute(
+            select(Idea.version, Project.updated_at)
+            .join(Project, Project.id == Idea.project_id)
+            .where(Idea.id == idea_id)
+        )
+        return result.one_or_none()
+
+    async def bump_idea_version(self, idea_id: uuid.UUID, session: AsyncSession):
+        # runs in the caller's transaction so the new version commits with
+        # the change it describes
+        await session.execute(
+            update(Idea).where(Idea.id == idea_id).values(version=Idea.version + 1)
+        )
+
     async def create_idea(self, idea_data: IdeaCreationModel, session: AsyncSession):
         idea_data_dict = idea_data.model_dump()
 
@@ -69,6 +151,9 @@ class IdeaService:
             }
         )
         session.add(new_idea)
+        await project_stats_service.record_activity(
+            session, project_id=project.id, ideas=1
+        )
         await session.commit()
         await session.refresh(new_idea)
 
@@ -81,27 +166,16 @@ class IdeaService:
         current_user_id: Optional[uuid.UUID] = None,
     ) -> Tuple[List[Dict], Optional[datetime]]:
         try:
-            upvotes_subquery = (
-                select(Vote.idea_id, func.count(Vote.id).label("upvotes"))
-                .where(Vote.is_upvote.is_(True))
-                .group_by(Vote.idea_id)
-                .subquery()
-            )
-
-            downvotes_subquery = (
-                select(Vote.idea_id, func.count(Vote.id).label("downvotes"))
-                .where(Vote.is_upvote.is_(False))
-                .group_by(Vote.idea_id)
-                .subquery()
-            )
+            upvotes_subquery = vote_count_subquery(is_upvote=True)
+            downvotes_subquery = vote_count_subquery(is_upvote=False)
             # First, get the ideas with votes and basic info
             main_query = (
                 select(
                     Idea,
                     Project.name.label("project_name"),
                     User.username.label("creator_username"),
-                    func.coalesce(upvotes_subquery.c.upvotes, 0).label("upvotes"),
-                    func.coalesce(downvotes_subquery.c.downvotes, 0).label("downvotes"),
+                    upvotes_subquery.label("upvotes"),
+                    downvotes_subquery.label("downvotes"),
                     func.bool_or(
                         and_(Vote.user_id == current_user_id, Vote.is_upvote.is_(True))
                     ).label("user_upvoted"),
@@ -121,14 +195,10 @@ class IdeaService:
                     IdeaCategoryAssociation, IdeaCategoryAssociation.idea_id == Idea.id
                 )
                 .outerjoin(Category, Category.id == IdeaCategoryAssociation.category_id)
-                .outerjoin(upvotes_subquery, upvotes_subquery.c.idea_id == Idea.id)
-                .outerjoin(downvotes_subquery, downvotes_subquery.c.idea_id == Idea.id)
                 .group_by(
                     Idea.id,
                     Project.id,
                     User.id,
-                    upvotes_subquery.c.upvotes,
-                    downvotes_subquery.c.downvotes,
                 )
             )
 
@@ -205,23 +275,23 @@ class IdeaService:
                     comments_by_idea[comment.idea_id].append(
                         {
                             "content": comment.content,
-                            "created_at": comment.created_at.isoformat(),
+                            "created_at": comment.created_at,
                             "commenter_username": comment.commenter_username,
                         }
                     )
 
-            # Process results
+            # Process results; UUIDs and datetimes are left for orjson to encode
             ideas_list = []
             for row in rows:
                 idea_dict = {
-                    "id": str(row.Idea.id),
+                    "id": row.Idea.id,
                     "title": row.Idea.title,
                     "description": row.Idea.description,
-                    "project_id": str(row.Idea.project_id),
+                    "project_id": row.Idea.project_id,
                     "project_name": row.project_name,
-                    "creator_id": str(row.Idea.creator_id),
+                    "creator_id": row.Idea.creator_id,
                     "creator_username": row.creator_username,
-                    "created_at": row.Idea.created_at.isoformat(),
+                    "created_at": row.Idea.created_at,
                     "category_names": row.category_names,
                     "votes": {
                         "upvotes": row.upvotes,
@@ -253,8 +323,11 @@ class IdeaService:
             )
 
             return ideas_list, next_cursor
+        except SQLAlchemyError:
+            # statement timeouts and pool exhaustion map to 504/503
+            raise
         except Exception as e:
-            print(f"Error in search_ideas: {str(e)}")
+            logger.exception("Error in search_ideas")
             raise HTTPException(
                 status_code=500, detail="An error occurred while searching ideas"
             )
@@ -265,138 +338,153 @@ class IdeaService:
         session: AsyncSession,
         current_user_id: Optional[uuid.UUID] = None,
     ):
-        try:
-            # Subqueries for upvotes and downvotes
-            upvotes_subquery = (
-                select(Vote.idea_id, func.count(Vote.id).label("upvotes"))
-                .where(Vote.is_upvote.is_(True))
-                .group_by(Vote.idea_id)
-                .subquery()
-            )
+        ideas = await self.get_ideas_by_ids([idea_id], session, current_user_id)
+        return ideas[0]
 
-            downvotes_subquery = (
-                select(Vote.idea_id, func.count(Vote.id).label("downvotes"))
-                .where(Vote.is_upvote.is_(False))
-                .group_by(Vote.idea_id)
-                .subquery()
-            )
+    async def get_ideas_by_ids(
+        self,
+        idea_ids: List[uuid.UUID],
+        session: AsyncSession,
+        current_user_id: Optional[uuid.UUID] = None,
+        comment_limit: Optional[int] = None,
+    ) -> List[Optional[Dict]]:
+        """Full idea details for each id, in order, None where missing.
+
+        One query for the ideas and one for their comments, however many
+        ids are asked for. The per-user flags and category names are
+        correlated subqueries, so the ideas query returns one row per idea
+        rather than multiplying its votes, comments and categories. With
+        ``comment_limit`` only that many of each idea's newest comments are
+        loaded; ``comments_count`` is still the full count.
+        """
+        try:
+            if current_user_id is not None:
+                user_flags = (
+                    user_voted_subquery(current_user_id, is_upvote=True),
+                    user_voted_subquery(current_user_id, is_upvote=False),
+                    user_commented_subquery(current_user_id),
+                )
+            else:
+                user_flags = (false(), false(), false())
 
-            # Main query for idea details and votes
             main_query = (
                 select(
                     Idea,
                     Project.name.label("project_name"),
                     User.username.label("creator_username"),
-                    func.coalesce(upvotes_subquery.c.upvotes, 0).label("upvotes"),
-                    func.coalesce(downvotes_subquery.c.downvotes, 0).label("downvotes"),
-                    func.bool_or(
-                        and_(Vote.user_id == current_user_id, Vote.is_upvote.is_(True))
-                    ).label("user_upvoted"),
-                    func.bool_or(
-                        and_(Vote.user_id == current_user_id, Vote.is_upvote.is_(False))
-                    ).label("user_downvoted"),
-                    func.count(case((Comment.user_id == current_user_id, 1))).label(
-                        "user_commented"
-                    ),
-                    array_agg(distinct(Category.name)).label("category_names"),
+                    vote_count_subquery(is_upvote=True).label("upvotes"),
+                    vote_count_subquery(is_upvote=False).label("downvotes"),
+                    user_flags[0].label("user_upvoted"),
+                    user_flags[1].label("user_downvoted"),
+                    user_flags[2].label("user_commented"),
+                    category_names_subquery().label("category_names"),
                 )
                 .join(Project, Idea.project_id == Project.id)
                 .join(User, Idea.creator_id == User.id)
-                .outerjoin(Vote, Vote.idea_id == Idea.id)
-                .outerjoin(Comment, Comment.idea_id == Idea.id)
-                .outerjoin(
-                    IdeaCategoryAssociation, IdeaCategoryAssociation.idea_id == Idea.id
-                )
-                .outerjoin(Category, Category.id == IdeaCategoryAssociation.category_id)
-                .outerjoin(upvotes_subquery, upvotes_subquery.c.idea_id == Idea.id)
-                .outerjoin(downvotes_subquery, downvotes_subquery.c.idea_id == Idea.id)
-                .where(Idea.id == idea_id)
-                .group_by(
-                    Idea.id,
-                    Project.id,
-                    User.id,
-                    upvotes_subquery.c.upvotes,
-                    downvotes_subquery.c.downvotes,
-                )
+                .where(Idea.id.in_(list(dict.fromkeys(idea_ids))))
             )
 
             # Execute main query
             results = await session.execute(main_query)
-            row = results.one_or_none()
-
-            if not row:
-                return None
+            rows = {row.Idea.id: row for row in results.all()}
 
-            idea = row.Idea
+            if not rows:
+                return [None] * len(idea_ids)
 
-            # Fetch all comments for the idea
-            comments_query = (
+            # Fetch the ideas' comments, newest first, in a single query
+            ranked = (
                 select(
+                    Comment.idea_id,
                     Comment.id,
                     Comment.content,
                     Comment.created_at,
                     User.username.label("commenter_username"),
                     User.id.label("commenter_id"),
+                    func.row_number()
+                    .over(
+                        partition_by=Comment.idea_id,
+                        order_by=Comment.created_at.desc(),
+                    )
+                    .label("position"),
+                    func.count()
+                    .over(partition_by=Comment.idea_id)
+                    .label("comments_count"),
                 )
                 .join(User, User.id == Comment.user_id)
-                .where(Comment.idea_id == idea_id)
-                .order_by(Comment.created_at.desc())
+                .where(Comment.idea_id.in_(list(rows)))
+                .subquery()
+            )
+            comments_query = select(ranked).order_by(
+                ranked.c.idea_id, ranked.c.position
             )
+            if comment_limit is not None:
+                comments_query = comments_query.where(
+                    ranked.c.position <= comment_limit
+                )
 
             comments_results = await session.execute(comments_query)
-            comments = comments_results.all()
-
-            # Build the response dictionary
-            idea_dict = {
-                "id": str(idea.id),
-                "title": idea.title,
-                "description": idea.description,
-                "project_id": str(idea.project_id),
-                "project_name": row.project_name,
-                "creator_id": str(idea.creator_id),
-                "creator_username": row.creator_username,
-                "created_at": idea.created_at.isoformat(),
-                "category_names": row.category_names,
-                "votes": {
-                    "upvotes": row.upvotes,
-                    "downvotes": row.downvotes,
-                    "total": row.upvotes + row.downvotes,
-                    "score": row.upvotes - row.downvotes,
-                },
-                "comments": [
+            comments_by_idea = {}
+            comment_counts = {}
+            for comment in comments_results.all():
+                comment_counts[comment.idea_id] = comment.comments_count
+                comments_by_idea.setdefault(comment.idea_id, []).append(
                     {
-                        "id": str(comment.id),
+                        "id": comment.id,
                         "content": comment.content,
-                        "created_at": comment.created_at.isoformat(),
+                        "created_at": comment.created_at,
                         "commenter_username": comment.commenter_username,
-                        "commenter_id": str(comment.commenter_id),
-                        "is_user_comment": (
-                            str(comment.commenter_id) == str(current_user_id)
-                            if current_user_id
-                            else False
-                        ),
+                        "commenter_id": comment.commenter_id,
+                        "is_user_comment": comment.commenter_id == current_user_id,
                     }
-                    for comment in comments
-                ],
-                "comments_count": len(comments),
-            }
+                )
 
-            # Add user-specific data if user_id was provided
-            if current_user_id:
-                idea_dict["has_commented"] = bool(row.user_commented)
-                idea_dict["user_vote"] = {
-                    "has_voted": bool(row.user_upvoted or row.user_downvoted),
-                    "is_upvote": (
-                        bool(row.user_upvoted)
-                        if (row.user_upvoted or row.user_downvoted)
-                        else None
-                    ),
+            ideas = {}
+            for idea_id, row in rows.items():
+                idea = row.Idea
+                comments = comments_by_idea.get(idea_id, [])
+
+                # Build the response dictionary
+                idea_dict = {
+                    "id": idea.id,
+                    "title": idea.title,
+                    "description": idea.description,
+                    "project_id": idea.project_id,
+                    "project_name": row.project_name,
+                    "creator_id": idea.creator_id,
+                    "creator_username": row.creator_username,
+                    "created_at": idea.created_at,
+                    "category_names": row.category_names or [],
+                    "votes": {
+                        "upvotes": row.upvotes,
+                        "downvotes": row.downvotes,
+                        "total": row.upvotes + row.downvotes,
+                        "score": row.upvotes - row.downvotes,
+                    },
+                    "comments": comments,
+                    "comments_count": comment_counts.get(idea_id, 0),
                 }
 
-            return idea_dict
+                # Add user-specific data if user_id was provided
+                if current_user_id:
+                    idea_dict["has_commented"] = bool(row.user_commented)
+                    idea_dict["user_vote"] = {
+                        "has_voted": bool(row.user_upvoted or row.user_downvoted),
+                        "is_upvote": (
+                            bool(row.user_upvoted)
+                            if (row.user_upvoted or row.user_downvoted)
+                            else None
+                        ),
+                    }
+
+                ideas[idea_id] = idea_dict
 
+            return [ideas.get(idea_id) for idea_id in idea_ids]
+
+        except SQLAlchemyError:
+            # statement timeouts and pool exhaustion map to 504/503
+            raise
         except Exception as e:
-            print(f"Error in get_idea_by_id: {str(e)}")
+            logger.exception("Error in get_ideas_by_ids")
             raise HTTPException(
                 status_code=500, detail="An error occurred while fetching the idea"
             )
@@ -419,6 +507,10 @@ class IdeaService:
             raise IdeaNotFound
         comment = Comment(**comment_data_dict)
         session.add(comment)
+        await self.bump_idea_version(idea.id, session)
+        await project_stats_service.record_activity(
+            session, idea_id=idea.id, comments=1
+        )
         await session.commit()
         await session.refresh(comment)
         return comment
@@ -498,10 +590,20 @@ class IdeaService:
             # Update existing vote if different
             if existing_vote.is_upvote != vote_data.is_upvote:
                 existing_vote.is_upvote = vote_data.is_upvote
+                await self.bump_idea_version(idea_id, session)
+                # the vote moves from one counter to the other
+                moved = 1 if existing_vote.is_upvote else -1
+                await project_stats_service.record_activity(
+                    session, idea_id=idea_id, upvotes=moved, downvotes=-moved
+                )
                 await session.commit()
                 return existing_vote
             else:
                 await session.delete(existing_vote)
+                await self.bump_idea_version(idea_id, session)
+                await project_stats_service.record_activity(
+                    session, idea_id=idea_id, **vote_deltas(existing_vote, -1)
+                )
                 await session.commit()
                 return None
         else:
@@ -514,6 +616,10 @@ class IdeaService:
                 }
             )
             session.add(new_vote)
+            await self.bump_idea_version(idea_id, session)
+            await project_stats_service.record_activity(
+                session, idea_id=idea_id, **vote_deltas(new_vote, 1)
+            )
             await session.commit()
             return new_vote
 
@@ -527,6 +633,10 @@ class IdeaService:
 
         if vote:
             await session.delete(vote)
+            await self.bump_idea_version(idea_id, session)
+            await project_stats_service.record_activity(
+                session, idea_id=idea_id, **vote_deltas(vote, -1)
+            )
             await session.commit()
             return vote
 
@@ -0,0 +1,171 @@
+import base64
+import hashlib
+import json
+import re
+from typing import List, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.auth.utils import decode_token
+from src.config import Config
+from src.db.redis import (
+    claim_idempotency_key,
+    get_idempotency_record,
+    release_idempotency_key,
+    store_idempotency_record,
+    token_in_blocklist,
+)
+
+# idea creation, comments and votes; a vote toggles, so a retried vote
+# would undo itself
+IDEMPOTENT_PATHS = re.compile(r"/ideas/(?:[0-9a-fA-F-]+/(?:comment|votes))?$")
+
+# answers that say "not now" rather than "no": rate limits, shed load,
+# timeouts
+RETRYABLE_STATUSES = {408, 425, 429, 503, 504}
+
+
+def is_final(start: Message) -> bool:
+    """Whether a response is an outcome worth replaying for the key."""
+    if start["status"] >= 500 or start["status"] in RETRYABLE_STATUSES:
+        return False
+    return all(name.lower() != b"retry-after" for name, _ in start["headers"])
+
+
+class IdempotencyMiddleware:
+    """Replays the stored response for a repeated ``Idempotency-Key``.
+
+    The first request with a key claims it in Redis with SET NX and runs.
+    Its response is stored under the key for IDEMPOTENCY_TTL_SECONDS, and
+    retries get that response back without reaching the route or Postgres.
+    Keys are scoped to the caller's user and the request path. Only final
+    outcomes, 2xx and deterministic 4xx, are stored; a server error or a
+    transient refusal (429, 503, anything with Retry-After) releases the
+    key so the client can retry for real.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not IDEMPOTENT_PATHS.search(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        user_id = await self.user_id(headers) if idempotency_key else None
+        if user_id is None:
+            # unauthenticated requests are rejected by the route anyway
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        body_sent = False
+
+        async def replay_body() -> Message:
+            # the body once, then the real channel, which reports disconnects
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        key = f"idempotency:{user_id}:{scope['path']}:{idempotency_key}"
+        fingerprint = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+        if not await claim_idempotency_key(
+            key,
+            json.dumps({"fingerprint": fingerprint}),
+            Config.IDEMPOTENCY_LOCK_SECONDS,
+        ):
+            response = self.replay(await get_idempotency_record(key), fingerprint)
+            await response(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, send_wrapper)
+        except BaseException:
+            await release_idempotency_key(key)
+            raise
+
+        if start is None or not is_final(start):
+            await release_idempotency_key(key)
+            return
+        await store_idempotency_record(
+            key,
+            json.dumps(
+                {
+                    "fingerprint": fingerprint,
+                    "status": start["status"],
+                    "headers": [
+                        [name.decode("latin-1"), value.decode("latin-1")]
+                        for name, value in start["headers"]
+                        if name.lower() != b"content-length"
+                    ],
+                    "body": base64.b64encode(b"".join(chunks)).decode(),
+                }
+            ),
+            Config.IDEMPOTENCY_TTL_SECONDS,
+        )
+
+    async def user_id(self, headers: Headers) -> Optional[str]:
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            return None
+        token_data = decode_token(token)
+        if token_data is None or await token_in_blocklist(token_data["jti"]):
+            return None
+        return token_data["user"]["user_id"]
+
+    def replay(self, record: Optional[str], fingerprint: str) -> Response:
+        record = json.loads(record) if record else None
+        if record is not None and record["fingerprint"] != fingerprint:
+            return JSONResponse(
+                status_code=422,
+                content={
+                    "message": "Idempotency-Key was already used for another request",
+                    "error_code": "idempotency_key_reused",
+                },
+            )
+        if record is None or "status" not in record:
+            return JSONResponse(
+                status_code=409,
+                content={
+                    "message": "A request with this Idempotency-Key is in progress",
+                    "error_code": "idempotency_key_in_progress",
+                },
+            )
+
+        response = Response(base64.b64decode(record["body"]), record["status"])
+        response.raw_headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in record["headers"]
+        ] + [
+            (b"content-length", str(len(response.body)).encode()),
+            (b"idempotent-replayed", b"true"),
+        ]
+        return response
@@ -0,0 +1,158 @@
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config import Config
+from src.metrics.collectors import LOAD_SHED_IN_FLIGHT, LOAD_SHED_REQUESTS
+
+FEED_PATHS = re.compile(r"/(?:ideas|project)/$")
+EXEMPT_PATHS = re.compile(r"^/metrics$|/docs|/redoc|/openapi\.json$")
+
+
+def route_class(scope: Scope) -> Optional[str]:
+    """Which budget a request draws on; None for exempt routes."""
+    path = scope["path"]
+    if EXEMPT_PATHS.search(path):
+        return None
+    if "/auth/" in path:
+        return "auth"
+    if path.endswith(":batchGet"):
+        # a read, despite the POST
+        return "detail"
+    if scope["method"] not in ("GET", "HEAD"):
+        return "writes"
+    if FEED_PATHS.search(path):
+        return "feed"
+    if "/ideas/" in path or "/project/" in path:
+        return "detail"
+    return "default"
+
+
+class ConcurrencyLimit:
+    """In-flight cap for one route class, with a short FIFO wait for a slot.
+
+    When ``adaptive``, the cap shrinks by 10% when requests finish slower
+    than ``target_latency`` (at most once per target interval) and grows
+    by one after a cap's worth of fast ones, never above ``max_limit``.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        queue_timeout: float,
+        adaptive: bool = False,
+        target_latency: float = 0.5,
+    ):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._fast_streak = 0
+        self._last_decrease = 0.0
+
+    async def acquire(self) -> bool:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.limit:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # the slot was handed over just as the client went away
+            if waiter.done() and not waiter.cancelled():
+                self.release(0)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency: float) -> None:
+        self.in_flight -= 1
+        if self.adaptive:
+            self._adapt(latency)
+        # hand freed slots straight to waiters, oldest first
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _adapt(self, latency: float) -> None:
+        now = time.monotonic()
+        if latency > self.target_latency:
+            self._fast_streak = 0
+            if now - self._last_decrease > self.target_latency:
+                self.limit = max(1, int(self.limit * 0.9))
+                self._last_decrease = now
+        else:
+            self._fast_streak += 1
+            if self._fast_streak >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._fast_streak = 0
+
+
+class LoadSheddingMiddleware:
+    """Caps in-flight requests per worker for each route class.
+
+    A request over its class's cap waits up to LOAD_SHED_QUEUE_TIMEOUT_MS
+    for a slot and then gets a 503, so a saturated feed sheds its own
+    excess quickly instead of starving the database pool for every other
+    route. Classes missing from LOAD_SHED_LIMITS share the "default" cap.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.limits: Dict[str, ConcurrencyLimit] = {
+            name: ConcurrencyLimit(
+                limit,
+                Config.LOAD_SHED_QUEUE_TIMEOUT_MS / 1000,
+                Config.LOAD_SHED_ADAPTIVE,
+                Config.LOAD_SHED_TARGET_LATENCY_MS.get(name, 500) / 1000,
+            )
+            for name, limit in Config.LOAD_SHED_LIMITS.items()
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        name = route_class(scope) if scope["type"] == "http" else None
+        if name is not None and name not in self.limits:
+            name = "default"
+        limit = self.limits.get(name)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limit.acquire():
+            LOAD_SHED_REQUESTS.labels(name).inc()
+            response = JSONResponse(
+                status_code=503,
+                content={
+                    "message": "The service is busy, please try again shortly",
+                    "error_code": "overloaded",
+                },
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        LOAD_SHED_IN_FLIGHT.labels(name).inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            LOAD_SHED_IN_FLIGHT.labels(name).dec()
+            limit.release(time.perf_counter() - start_time)
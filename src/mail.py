@@ -1,22 +1,35 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from typing import AsyncIterator, Dict, List, Tuple
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader
 from fastapi_mail import FastMail, ConnectionConfig, MessageSchema, MessageType
 from src.config import Config
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
+TEMPLATE_FOLDER = Path(BASE_DIR, "templates")
+
+logger = logging.getLogger(__name__)
 
 
 mail_config = ConnectionConfig(
     MAIL_USERNAME=Config.MAIL_USERNAME,
     MAIL_PASSWORD=Config.MAIL_PASSWORD,
     MAIL_FROM=Config.MAIL_FROM,
-    MAIL_PORT=587,
+    MAIL_PORT=Config.MAIL_PORT,
     MAIL_SERVER=Config.MAIL_SERVER,
     MAIL_FROM_NAME=Config.MAIL_FROM_NAME,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    # TEMPLATE_FOLDER=Path(BASE_DIR, "templates"),
+    MAIL_STARTTLS=Config.MAIL_STARTTLS,
+    MAIL_SSL_TLS=Config.MAIL_SSL_TLS,
+    USE_CREDENTIALS=Config.USE_CREDENTIALS,
+    VALIDATE_CERTS=Config.VALIDATE_CERTS,
+    TEMPLATE_FOLDER=TEMPLATE_FOLDER,
 )
 
 
@@ -30,3 +43,220 @@ def create_message(recipients: list[str], subject: str, body: str):
     )
 
     return message
+
+
+class EmailTemplates:
+    """Jinja email templates, compiled once per process and kept.
+
+    Each template sets its ``subject`` at the top level; it is read from
+    the template module once and cached with the compiled template, so a
+    render only evaluates the per-recipient parts.
+    """
+
+    def __init__(self, folder: Path = TEMPLATE_FOLDER):
+        self.env = Environment(
+            loader=FileSystemLoader(folder),
+            autoescape=True,
+            auto_reload=False,
+            cache_size=-1,
+        )
+        self.env.globals["domain"] = Config.DOMAIN
+        self._subjects: Dict[str, str] = {}
+
+    def compile_all(self) -> None:
+        for name in self.env.list_templates():
+            template = self.env.get_template(name)
+            self._subjects[name] = getattr(template.module, "subject", "")
+
+    def render(self, name: str, context: dict) -> Tuple[str, str]:
+        """The subject and HTML body of template ``name``."""
+        template = self.env.get_template(name)
+        if name not in self._subjects:
+            self._subjects[name] = getattr(template.module, "subject", "")
+        return self._subjects[name], template.render(context)
+
+
+email_templates = EmailTemplates()
+
+
+class SMTPPool:
+    """Authenticated SMTP connections kept open and reused between messages.
+
+    FastMail.send_message connects, negotiates STARTTLS and logs in for
+    every message. The pool pays that once per connection instead. A
+    connection that has sat idle is checked with NOOP before use, and a
+    send that finds the server gone reconnects and retries once.
+
+    All use must come from one event loop.
+    """
+
+    def __init__(
+        self,
+        config: ConnectionConfig = mail_config,
+        size: int = Config.MAIL_POOL_SIZE,
+        idle_check_seconds: float = Config.MAIL_POOL_IDLE_CHECK_SECONDS,
+    ):
+        self.config = config
+        self.size = size
+        self.idle_check_seconds = idle_check_seconds
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(size)
+
+    @property
+    def sender(self) -> str:
+        if self.config.MAIL_FROM_NAME is not None:
+            return f"{self.config.MAIL_FROM_NAME} <{self.config.MAIL_FROM}>"
+        return self.config.MAIL_FROM
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+        )
+        await client.connect()
+        try:
+            if self.config.USE_CREDENTIALS:
+                await client.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD)
+        except BaseException:
+            client.close()
+            raise
+        return client
+
+    def build_message(self, message: MessageSchema) -> EmailMessage:
+        """The MIME message for one of our single-part emails."""
+        msg = EmailMessage()
+        msg["Date"] = formatdate(localtime=True)
+        msg["Message-ID"] = make_msgid()
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(str(r) for r in message.recipients)
+        msg["Subject"] = message.subject
+        msg.set_content(message.body, subtype=message.subtype.value)
+        return msg
+
+    async def _reset(self, client: aiosmtplib.SMTP) -> bool:
+        try:
+            await client.rset()
+            return True
+        except (aiosmtplib.SMTPException, OSError):
+            return False
+
+    async def _usable(self, client: aiosmtplib.SMTP, last_used: float) -> bool:
+        if not client.is_connected:
+            return False
+        if time.monotonic() - last_used < self.idle_check_seconds:
+            return True
+        # servers drop idle sessions, so probe before trusting an old one
+        try:
+            await client.noop()
+            return True
+        except (aiosmtplib.SMTPException, OSError):
+            client.close()
+            return False
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        async with self._slots:
+            client = None
+            while self._idle and client is None:
+                candidate, last_used = self._idle.pop()
+                if await self._usable(candidate, last_used):
+                    client = candidate
+            if client is None:
+                client = await self._connect()
+
+            reusable = False
+            try:
+                yield client
+                reusable = True
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                # refused at MAIL FROM, RCPT or DATA; the session is still
+                # good once reset
+                reusable = await self._reset(client)
+                raise
+            finally:
+                # anything else (a dropped connection, a timeout, a
+                # cancellation) may leave the session mid-command
+                if reusable and client.is_connected:
+                    self._idle.append((client, time.monotonic()))
+                else:
+                    client.close()
+
+    async def send_message(self, message: MessageSchema) -> None:
+        msg = self.build_message(message)
+        if self.config.SUPPRESS_SEND:
+            return
+        try:
+            async with self.connection() as client:
+                await client.send_message(msg)
+        except aiosmtplib.SMTPServerDisconnected:
+            logger.info("SMTP connection dropped, reconnecting")
+            async with self.connection() as client:
+                await client.send_message(msg)
+
+    async def send_batch(self, messages: List[MessageSchema]) -> List[Dict[str, str]]:
+        """Send ``messages`` in order over one pooled connection.
+
+        Returns, per message, each recipient's outcome: "sent", the
+        server's refusal as "refused <code> <reason>", or "deferred" when
+        the connection failed before the message went out. A dropped
+        connection is re-established once per batch.
+        """
+        if self.config.SUPPRESS_SEND:
+            return [{str(r): "sent" for r in m.recipients} for m in messages]
+
+        outcomes: List[Dict[str, str]] = []
+        pending = list(messages)
+        reconnects = 1
+        while pending:
+            try:
+                async with self.connection() as client:
+                    while pending:
+                        outcomes.append(await self._send_one(client, pending[0]))
+                        pending.pop(0)
+            except (
+                aiosmtplib.SMTPServerDisconnected,
+                aiosmtplib.SMTPTimeoutError,
+                OSError,
+            ) as e:
+                if not reconnects:
+                    logger.warning("SMTP unavailable, deferring batch: %s", e)
+                    break
+                reconnects -= 1
+                logger.info("SMTP connection dropped, reconnecting")
+
+        for message in pending:
+            outcomes.append({str(r): "deferred" for r in message.recipients})
+        return outcomes
+
+    async def _send_one(
+        self, client: aiosmtplib.SMTP, message: MessageSchema
+    ) -> Dict[str, str]:
+        recipients = [str(r) for r in message.recipients]
+        msg = self.build_message(message)
+        try:
+            refused, _ = await client.send_message(msg)
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            refused = {r.recipient: (r.code, r.message) for r in e.recipients}
+        except aiosmtplib.SMTPResponseException as e:
+            # rejected at MAIL FROM or DATA; the session itself is still fine
+            return dict.fromkeys(recipients, f"refused {e.code} {e.message}")
+        return {
+            recipient: (
+                f"refused {refused[recipient][0]} {refused[recipient][1]}"
+                if recipient in refused
+                else "sent"
+            )
+            for recipient in recipients
+        }
+
+    async def close(self) -> None:
+        while self._idle:
+            client, _ = self._idle.pop()
+            try:
+                await client.quit()
+            except aiosmtplib.SMTPException:
+                client.close()
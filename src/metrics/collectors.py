@@ -0,0 +1,108 @@
+import atexit
+import os
+import time
+from contextlib import asynccontextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, multiprocess
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# With several workers each process writes its samples to
+# PROMETHEUS_MULTIPROC_DIR and /metrics merges them. Gauges say how
+# values from different processes combine; "live" modes drop the values
+# of workers that have exited.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+if MULTIPROCESS:
+    atexit.register(multiprocess.mark_process_dead, os.getpid())
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status code",
+    ["method", "route", "status"],
+)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Database connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_connections_open",
+    "Database connections currently open in the pool",
+    multiprocess_mode="livesum",
+)
+
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds",
+    "Redis command latency",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+WEBSOCKET_CONNECTIONS = Gauge(
+    "websocket_connections",
+    "Open vote WebSocket connections per worker",
+    multiprocess_mode="liveall",
+)
+
+EMAIL_QUEUE_DEPTH = Gauge(
+    "celery_email_queue_depth",
+    "Emails queued for the next flush_email_queue batch",
+    multiprocess_mode="livemostrecent",
+)
+
+LOAD_SHED_REQUESTS = Counter(
+    "http_requests_shed_total",
+    "Requests turned away with a 503 by route class",
+    ["route_class"],
+)
+
+LOAD_SHED_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being handled by route class",
+    ["route_class"],
+    multiprocess_mode="livesum",
+)
+
+
+def observe_request(method: str, route: str, status: int, duration: float) -> None:
+    REQUEST_COUNT.labels(method, route, status).inc()
+    REQUEST_LATENCY.labels(method, route).observe(duration)
+
+
+@asynccontextmanager
+async def redis_timer(command: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        REDIS_LATENCY.labels(command).observe(time.perf_counter() - start_time)
+
+
+def register_pool_metrics(engine: AsyncEngine) -> None:
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        DB_POOL_SIZE.inc()
+
+    @event.listens_for(pool, "close")
+    def on_close(dbapi_connection, connection_record):
+        DB_POOL_SIZE.dec()
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
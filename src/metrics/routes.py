@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+
+from src.db.redis import EMAIL_QUEUE_KEY, token_blocklist
+from src.metrics.collectors import EMAIL_QUEUE_DEPTH, MULTIPROCESS
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    EMAIL_QUEUE_DEPTH.set(await token_blocklist.llen(EMAIL_QUEUE_KEY))
+
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -1,32 +1,134 @@
-from fastapi import FastAPI, status
-from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import queue
+import sys
 import time
 import os
 import logging
 
+from src.compression import CompressionMiddleware
+from src.config import Config
+from src.idempotency import IdempotencyMiddleware
+from src.load_shedding import LoadSheddingMiddleware
+from src.db.instrumentation import (
+    RequestQueryStats,
+    log_query_stats,
+    request_query_stats,
+)
+from src.metrics.collectors import observe_request
+
 logger = logging.getLogger("uvicorn.access")
 logger.disabled = True
 
+request_logger = logging.getLogger("src.requests")
+
 hosts = os.getenv("ALLOWED_HOSTS", "").split(",")
 origins = os.getenv("ALLOWED_ORIGINS", "").split(",")
 
 
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({"message": record.getMessage(), **record.request})
+
+
+def setup_request_logging() -> QueueListener:
+    """Send request records through a queue to a background listener thread.
+
+    The request path only enqueues the record; formatting and the write to
+    stdout happen on the listener thread, so the event loop never blocks on
+    I/O.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    request_logger.addHandler(QueueHandler(log_queue))
+    request_logger.setLevel(logging.INFO)
+    request_logger.propagate = False
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class RequestLoggingMiddleware:
+    """Times each HTTP request and logs one structured record for it."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        stats = RequestQueryStats()
+        stats_token = request_query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if Config.DB_QUERY_STATS_HEADERS:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Statement-Count"] = str(stats.statement_count)
+                    headers["X-DB-Time-Ms"] = f"{stats.total_time * 1000:.3f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_query_stats.reset(stats_token)
+            processing_time = time.perf_counter() - start_time
+
+            # label by route template so ids in paths don't explode cardinality
+            route = scope.get("route")
+            observe_request(
+                scope["method"],
+                route.path if route else "unmatched",
+                status_code,
+                processing_time,
+            )
+
+            client = scope.get("client")
+            log_query_stats(scope["method"], scope["path"], stats)
+            request_logger.info(
+                "request completed",
+                extra={
+                    "request": {
+                        "client": f"{client[0]}:{client[1]}" if client else None,
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round(processing_time * 1000, 3),
+                        "db_statements": stats.statement_count,
+                        "db_time_ms": round(stats.total_time * 1000, 3),
+                    }
+                },
+            )
+
+
 def register_middleware(app: FastAPI):
+    setup_request_logging()
 
-    @app.middleware("http")
-    async def custom_logging(request: Request, call_next):
-        start_time = time.time()
+    # inside compression, so stored responses are never encoded for one
+    # client and replayed to another
+    app.add_middleware(IdempotencyMiddleware)
 
-        response = await call_next(request)
-        processing_time = time.time() - start_time
+    app.add_middleware(CompressionMiddleware)
 
-        message = f"{request.client.host}:{request.client.port} - {request.method} - {request.url.path} - {response.status_code} completed after {processing_time}s"
+    app.add_middleware(LoadSheddingMiddleware)
 
-        print(message)
-        return response
+    app.add_middleware(RequestLoggingMiddleware)
 
     app.add_middleware(
         CORSMiddleware,
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import delete, update
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import Config
+from src.db.main import async_session_maker
+from src.db.models import Outbox
+from src.tasks import task_backend
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxService:
+    async def add(self, session: AsyncSession, topic: str, *args) -> None:
+        """Record a job for the relay in the caller's transaction.
+
+        It reaches the task backend only if the caller commits, and at least
+        once after that, so jobs must tolerate running twice.
+        """
+        session.add(Outbox(topic=topic, payload={"args": list(args)}))
+
+
+class OutboxRelay:
+    """Moves committed outbox rows to the task backend in batches.
+
+    Every API worker runs one. Rows are claimed with FOR UPDATE SKIP
+    LOCKED, so relays never wait on each other. With a durable backend a
+    row is deleted in the transaction that claimed it, once submitted.
+    The in-process backend loses its queue if the process dies, so there
+    the row is only leased for ``lease_seconds`` and the job deletes it
+    after its handler finishes; if it never does, the row is relayed again.
+    A row that fails to submit is retried later with a growing delay, and
+    after ``max_attempts`` it is left in the table for inspection.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = Config.OUTBOX_BATCH_SIZE,
+        poll_seconds: float = Config.OUTBOX_POLL_SECONDS,
+        retry_seconds: float = Config.OUTBOX_RETRY_SECONDS,
+        max_attempts: int = Config.OUTBOX_MAX_ATTEMPTS,
+        lease_seconds: float = Config.OUTBOX_LEASE_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        """Relay now rather than at the next poll; call after committing."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def relay_batch(self) -> int:
+        async with async_session_maker() as session:
+            now = func.timezone("utc", func.now())
+            result = await session.exec(
+                select(Outbox)
+                .where(
+                    Outbox.available_at <= now,
+                    Outbox.attempts < self.max_attempts,
+                )
+                .order_by(Outbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.all()
+
+            relayed, leased = [], []
+            for row in rows:
+                try:
+                    if task_backend.durable:
+                        await task_backend.submit(row.topic, *row.payload["args"])
+                        relayed.append(row.id)
+                    else:
+                        await task_backend.submit(
+                            "outbox", row.id, row.topic, *row.payload["args"]
+                        )
+                        leased.append(row.id)
+                except Exception as e:
+                    attempts = row.attempts + 1
+                    logger.warning(f"Outbox {row.id} ({row.topic}) failed: {e}")
+                    if attempts >= self.max_attempts:
+                        logger.error(f"Outbox {row.id} gave up after {attempts}")
+                    await session.execute(
+                        update(Outbox)
+                        .where(Outbox.id == row.id)
+                        .values(
+                            attempts=attempts,
+                            available_at=now
+                            + timedelta(seconds=self.retry_seconds * attempts),
+                        )
+                    )
+
+            if relayed:
+                await session.execute(delete(Outbox).where(Outbox.id.in_(relayed)))
+            if leased:
+                # counts as an attempt in case the job never finishes
+                await session.execute(
+                    update(Outbox)
+                    .where(Outbox.id.in_(leased))
+                    .values(
+                        attempts=Outbox.attempts + 1,
+                        available_at=now + timedelta(seconds=self.lease_seconds),
+                    )
+                )
+            await session.commit()
+            return len(rows)
+
+    async def run_leased(self, outbox_id: int, topic: str, *args) -> None:
+        """In-process job for a leased row: run its handler, then delete it."""
+        await task_backend.jobs[topic](*args)
+        async with async_session_maker() as session:
+            await session.execute(delete(Outbox).where(Outbox.id == outbox_id))
+            await session.commit()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                claimed = await self.relay_batch()
+            except Exception:
+                logger.exception("Outbox relay failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                # caught up; wait for a commit or the next poll
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def start(self) -> None:
+        task_backend.register("outbox", self.run_leased)
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+outbox_service = OutboxService()
+outbox_relay = OutboxRelay()
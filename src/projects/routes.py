@@ -1,22 +1,62 @@
-from typing import List
 import uuid
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.responses import JSONResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.dependencies import AccessTokenBearer
+from src.config import Config
 from src.db.main import get_session
-from src.db.models import Project
-from src.projects.services import ProjectService
-from .schemas import ProjectUpdateModel, ProjectCreationModel
+from src.db.models import Project, ProjectStats
+from src.projects.services import ProjectService, ProjectStatsService
+from .schemas import (
+    ProjectCreationModel,
+    ProjectListParams,
+    ProjectPage,
+    ProjectUpdateModel,
+)
 from src.errors import InvalidCredentials, ProjectNotFound, UserNotFound
+from src.http_cache import make_etag, not_modified, set_cache_headers
+from src.tasks import project_deletion_status, task_backend
 
 project_router = APIRouter()
 project_servie = ProjectService()
+project_stats_service = ProjectStatsService()
 
 
-@project_router.get("/", response_model=List[Project])
-async def get_all_projects(session: AsyncSession = Depends(get_session)):
-    projects = await project_servie.get_all_projects(session)
-    return projects
+@project_router.get("/", response_model=ProjectPage)
+async def get_all_projects(
+    request: Request,
+    response: Response,
+    params: ProjectListParams = Depends(),
+    session: AsyncSession = Depends(get_session),
+):
+    version = await project_servie.get_projects_version(session)
+    if not params.with_stats:
+        etag = make_etag("projects", *version)
+        cached = not_modified(request, etag, anonymous=True)
+        if cached:
+            return cached
+
+    page = await project_servie.get_all_projects(session, params)
+
+    if params.with_stats:
+        stats = await project_stats_service.get_stats_for_projects(
+            [item["id"] for item in page["items"]], session
+        )
+        # the cached page is shared, so build a new one around it
+        page = {
+            **page,
+            "items": [{**item, "stats": stats[item["id"]]} for item in page["items"]],
+        }
+        # stats move with every vote, so tag the values actually served
+        etag = make_etag(
+            "projects", *version, *(row.model_dump_json() for row in stats.values())
+        )
+        cached = not_modified(request, etag, anonymous=True)
+        if cached:
+            return cached
+
+    set_cache_headers(response, etag, anonymous=True)
+    return page
 
 
 @project_router.get("/{project_id}", response_model=Project)
@@ -29,6 +69,13 @@ async def get_project_by_id(
     return project
 
 
+@project_router.get("/{project_id}/stats", response_model=ProjectStats)
+async def get_project_stats(
+    project_id: uuid.UUID, session: AsyncSession = Depends(get_session)
+):
+    return await project_stats_service.get_project_stats(project_id, session)
+
+
 @project_router.post("/", response_model=Project)
 async def create_project(
     project_data: ProjectCreationModel,
@@ -63,7 +110,7 @@ async def update_project(
 @project_router.delete("/{project_id}", response_model=Project)
 async def delete_project(
     project_id: uuid.UUID,
-    token: dict = Depends(AccessTokenBearer),
+    token: dict = Depends(AccessTokenBearer()),
     session: AsyncSession = Depends(get_session),
 ):
     project = await project_servie.get_project_by_id(project_id, session)
@@ -73,5 +120,23 @@ async def delete_project(
     if str(token["user"]["user_id"]) != str(project.creator_id):
         raise InvalidCredentials
 
+    # too big for one request transaction: delete in batches in the background
+    threshold = Config.PROJECT_DELETE_ASYNC_THRESHOLD
+    if await project_servie.count_ideas(project_id, session, threshold) > threshold:
+        task_id = str(uuid.uuid4())
+        await task_backend.submit("delete_project", task_id, str(project_id))
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"task_id": task_id, "status": "PENDING"},
+        )
+
     deleted_project = await project_servie.delete_project(project_id, session)
+    await project_servie.invalidate_project_list()
     return deleted_project
+
+
+@project_router.get("/deletions/{task_id}")
+async def get_project_deletion(
+    task_id: str, token: dict = Depends(AccessTokenBearer())
+):
+    return await project_deletion_status(task_id)
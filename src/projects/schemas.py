@@ -1,6 +1,10 @@
 import uuid
+from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
+from src.db.models import ProjectStats
+
 
 class ProjectCreationModel(BaseModel):
     name: str
@@ -13,3 +17,28 @@ class ProjectUpdateModel(BaseModel):
     name: str | None = None
     description: str | None = None
     url: str | None = None
+
+
+class ProjectListParams(BaseModel):
+    name_prefix: Optional[str] = None
+    limit: int = Field(default=20, ge=1, le=100)
+    # name of the last project on the previous page
+    cursor: Optional[str] = None
+    with_stats: bool = False
+
+
+class ProjectListItem(BaseModel):
+    id: uuid.UUID
+    name: str
+    description: str
+    url: str
+    creator_id: uuid.UUID
+    creted_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    # only present with ?with_stats=true
+    stats: Optional[ProjectStats] = None
+
+
+class ProjectPage(BaseModel):
+    items: List[ProjectListItem]
+    next_cursor: Optional[str] = None
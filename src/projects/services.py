@@ -1,10 +1,84 @@
+import inspect
+import logging
+import time
 import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+from sqlalchemy import delete, literal
+from sqlalchemy.dialects.postgresql import insert
+import sqlalchemy.dialects.postgresql as pg
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select
+from sqlmodel import func, select
 
-from src.db.models import Project, User
+from src.config import Config
+from src.db.models import (
+    Comment,
+    Idea,
+    IdeaCategoryAssociation,
+    Project,
+    ProjectStats,
+    User,
+    Vote,
+)
+from src.db.redis import bump_projects_generation, get_projects_generation
 from src.errors import ProjectNotFound, UserNotFound
-from src.projects.schemas import ProjectCreationModel, ProjectUpdateModel
+from src.projects.schemas import (
+    ProjectCreationModel,
+    ProjectListParams,
+    ProjectUpdateModel,
+)
+
+logger = logging.getLogger(__name__)
+
+STAT_COUNTERS = ["idea_count", "upvotes", "downvotes", "comment_count"]
+
+
+class ProjectListCache:
+    """Per-worker LRU of project listing pages.
+
+    Writes in this worker clear it straight away. Other workers see the
+    generation counter in Redis move on their next read and drop their
+    copy. Entries also expire after ``ttl`` seconds in case projects are
+    changed outside the API.
+    """
+
+    def __init__(
+        self,
+        ttl: float = Config.PROJECT_CACHE_TTL,
+        max_entries: int = Config.PROJECT_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation: Optional[int] = None
+        self.entries: OrderedDict = OrderedDict()
+
+    def sync(self, generation: int) -> None:
+        if generation != self.generation:
+            self.entries.clear()
+            self.generation = generation
+
+    def get(self, key: Hashable) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: int) -> None:
+        # a write landed while this value was loading, so it may be stale
+        if generation != self.generation:
+            return
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+project_list_cache = ProjectListCache()
 
 
 class ProjectService:
@@ -20,11 +94,52 @@ class ProjectService:
 
         return project
 
-    async def get_all_projects(self, session: AsyncSession):
-        statement = select(Project)
-        result = await session.exec(statement)
-        projects = result.all()
-        return projects
+    async def cached(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        generation = await get_projects_generation()
+        project_list_cache.sync(generation)
+        value = project_list_cache.get(key)
+        if value is None:
+            value = await load()
+            project_list_cache.set(key, value, generation)
+        return value
+
+    async def invalidate_project_list(self) -> None:
+        project_list_cache.entries.clear()
+        project_list_cache.sync(await bump_projects_generation())
+
+    async def get_all_projects(
+        self, session: AsyncSession, params: ProjectListParams
+    ) -> dict:
+        async def load() -> dict:
+            # keyset pagination on the unique name, so deep pages cost the
+            # same as the first one
+            statement = select(Project).order_by(Project.name).limit(params.limit)
+            if params.name_prefix:
+                statement = statement.where(
+                    Project.name.startswith(params.name_prefix, autoescape=True)
+                )
+            if params.cursor:
+                statement = statement.where(Project.name > params.cursor)
+
+            result = await session.exec(statement)
+            projects = [project.model_dump() for project in result.all()]
+            next_cursor = (
+                projects[-1]["name"] if len(projects) == params.limit else None
+            )
+            return {"items": projects, "next_cursor": next_cursor}
+
+        key = ("page", params.name_prefix, params.cursor, params.limit)
+        return await self.cached(key, load)
+
+    async def get_projects_version(self, session: AsyncSession) -> tuple:
+        async def load() -> tuple:
+            # creates and updates move max(updated_at), deletes move the count
+            result = await session.execute(
+                select(func.count(Project.id), func.max(Project.updated_at))
+            )
+            return tuple(result.one())
+
+        return await self.cached(("version",), load)
 
     async def project_exists(self, project_id: uuid.UUID, session: AsyncSession):
         project = await self.get_project_by_id(project_id, session)
@@ -52,6 +167,7 @@ class ProjectService:
         )
         session.add(new_project)
         await session.commit()
+        await self.invalidate_project_list()
         return new_project
 
     async def update_project(
@@ -63,14 +179,239 @@ class ProjectService:
             setattr(project, k, v)
 
         await session.commit()
+        await self.invalidate_project_list()
 
         return project
 
-    async def delete_project(self, project_id: uuid.UUID, session: AsyncSession):
+    async def delete_ideas(self, session: AsyncSession, idea_ids) -> Dict[str, int]:
+        """Set-based delete of ideas and everything hanging off them.
+
+        ``idea_ids`` is a list of ids or a select of them. Each table is
+        cleared with one DELETE, without loading rows into the session.
+        """
+        counts = {}
+        for name, model in (
+            ("votes", Vote),
+            ("comments", Comment),
+            ("category_links", IdeaCategoryAssociation),
+        ):
+            result = await session.execute(
+                delete(model)
+                .where(model.idea_id.in_(idea_ids))
+                .execution_options(synchronize_session=False)
+            )
+            counts[name] = result.rowcount
+        result = await session.execute(
+            delete(Idea)
+            .where(Idea.id.in_(idea_ids))
+            .execution_options(synchronize_session=False)
+        )
+        counts["ideas"] = result.rowcount
+        return counts
+
+    async def count_ideas(
+        self, project_id: uuid.UUID, session: AsyncSession, limit: Optional[int] = None
+    ) -> int:
+        """The project's idea count, or ``limit`` + 1 once it exceeds ``limit``.
+
+        Reads idea itself rather than project_stats, which a bulk load or a
+        missed delta can leave wrong, and stops early when bounded.
+        """
+        ideas = select(Idea.id).where(Idea.project_id == project_id)
+        if limit is not None:
+            ideas = ideas.limit(limit + 1)
+        result = await session.exec(select(func.count()).select_from(ideas.subquery()))
+        return result.one()
+
+    async def delete_project(
+        self,
+        project_id: uuid.UUID,
+        session: AsyncSession,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict[str, int]], Any]] = None,
+    ):
+        """Delete a project with its ideas, votes, comments and category links.
+
+        Without ``batch_size`` it all happens in one transaction. With it,
+        ideas go ``batch_size`` at a time with a commit per batch, which
+        keeps locks and WAL bounded for huge projects; ``on_progress`` gets
+        the running totals after each batch, and is awaited if it returns
+        an awaitable. project_stats goes with the
+        project through its ON DELETE CASCADE. Callers invalidate the
+        project list cache.
+        """
         project = await self.get_project_by_id(project_id, session)
+        project_ideas = select(Idea.id).where(Idea.project_id == project_id)
 
-        await session.delete(project)
+        totals = Counter()
+        if batch_size is None:
+            totals.update(await self.delete_ideas(session, project_ideas))
+        else:
+            while True:
+                result = await session.exec(project_ideas.limit(batch_size))
+                idea_ids = result.all()
+                if not idea_ids:
+                    break
+                totals.update(await self.delete_ideas(session, idea_ids))
+                await session.commit()
+                if on_progress is not None:
+                    progress = on_progress(dict(totals))
+                    if inspect.isawaitable(progress):
+                        await progress
 
+        await session.execute(
+            delete(Project)
+            .where(Project.id == project_id)
+            .execution_options(synchronize_session=False)
+        )
         await session.commit()
+        logger.info("Deleted project %s: %s", project_id, dict(totals))
 
         return project
+
+
+class ProjectStatsService:
+    async def record_activity(
+        self,
+        session: AsyncSession,
+        project_id: Optional[uuid.UUID] = None,
+        idea_id: Optional[uuid.UUID] = None,
+        ideas: int = 0,
+        upvotes: int = 0,
+        downvotes: int = 0,
+        comments: int = 0,
+    ) -> None:
+        """Add deltas to a project's rollup row in the caller's transaction.
+
+        Vote and comment writes only know the idea, so the project is looked
+        up inside the same upsert. Call this last before committing so the
+        project's row lock is held as briefly as possible.
+        """
+        deltas = [
+            literal(ideas),
+            literal(upvotes),
+            literal(downvotes),
+            literal(comments),
+            # naive UTC, like the other timestamps
+            func.timezone("utc", func.now()),
+        ]
+        if project_id is not None:
+            source = select(literal(project_id, type_=pg.UUID), *deltas)
+        else:
+            source = select(Idea.project_id, *deltas).where(Idea.id == idea_id)
+
+        statement = insert(ProjectStats).from_select(
+            ["project_id", *STAT_COUNTERS, "last_activity_at"], source
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[ProjectStats.project_id],
+            set_={
+                **{
+                    counter: getattr(ProjectStats, counter)
+                    + getattr(statement.excluded, counter)
+                    for counter in STAT_COUNTERS
+                },
+                "last_activity_at": statement.excluded.last_activity_at,
+            },
+        )
+        await session.execute(statement)
+
+    async def get_project_stats(
+        self, project_id: uuid.UUID, session: AsyncSession
+    ) -> ProjectStats:
+        stats = await session.get(ProjectStats, project_id)
+        if stats is None:
+            # projects without any activity yet have no row
+            result = await session.exec(
+                select(Project.id).where(Project.id == project_id)
+            )
+            if result.first() is None:
+                raise ProjectNotFound
+            stats = ProjectStats(project_id=project_id)
+        return stats
+
+    async def get_stats_for_projects(
+        self, project_ids: List[uuid.UUID], session: AsyncSession
+    ) -> Dict[uuid.UUID, ProjectStats]:
+        # primary key lookups, so the cost is per project rather than per
+        # idea or vote
+        result = await session.exec(
+            select(ProjectStats).where(ProjectStats.project_id.in_(project_ids))
+        )
+        stats = {row.project_id: row for row in result.all()}
+        # projects without any activity yet have no row
+        return {
+            project_id: stats.get(project_id) or ProjectStats(project_id=project_id)
+            for project_id in project_ids
+        }
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        """Recompute every project's rollup from the base tables.
+
+        Repairs drift from writes made outside the API. Deltas committed
+        while the rebuild runs can be overwritten, but the next run restores
+        them.
+        """
+        ideas = (
+            select(
+                Idea.project_id,
+                func.count().label("idea_count"),
+                func.max(Idea.created_at).label("last_at"),
+            )
+            .group_by(Idea.project_id)
+            .subquery()
+        )
+        votes = (
+            select(
+                Idea.project_id,
+                func.count().filter(Vote.is_upvote.is_(True)).label("upvotes"),
+                func.count().filter(Vote.is_upvote.is_(False)).label("downvotes"),
+            )
+            .select_from(Vote)
+            .join(Idea, Idea.id == Vote.idea_id)
+            .group_by(Idea.project_id)
+            .subquery()
+        )
+        comments = (
+            select(
+                Idea.project_id,
+                func.count().label("comment_count"),
+                func.max(Comment.created_at).label("last_at"),
+            )
+            .select_from(Comment)
+            .join(Idea, Idea.id == Comment.idea_id)
+            .group_by(Idea.project_id)
+            .subquery()
+        )
+        source = (
+            select(
+                Project.id,
+                func.coalesce(ideas.c.idea_count, 0),
+                func.coalesce(votes.c.upvotes, 0),
+                func.coalesce(votes.c.downvotes, 0),
+                func.coalesce(comments.c.comment_count, 0),
+                func.greatest(ideas.c.last_at, comments.c.last_at),
+            )
+            .outerjoin(ideas, ideas.c.project_id == Project.id)
+            .outerjoin(votes, votes.c.project_id == Project.id)
+            .outerjoin(comments, comments.c.project_id == Project.id)
+        )
+
+        statement = insert(ProjectStats).from_select(
+            ["project_id", *STAT_COUNTERS, "last_activity_at"], source
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[ProjectStats.project_id],
+            set_={
+                **{
+                    counter: getattr(statement.excluded, counter)
+                    for counter in STAT_COUNTERS
+                },
+                # votes carry no timestamp, so keep activity recorded live
+                "last_activity_at": func.greatest(
+                    ProjectStats.last_activity_at,
+                    statement.excluded.last_activity_at,
+                ),
+            },
+        )
+        await session.execute(statement)
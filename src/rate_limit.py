@@ -0,0 +1,116 @@
+import logging
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+from redis.exceptions import RedisError
+
+from src.auth.utils import decode_token
+from src.config import Config
+from src.db.redis import take_token
+from src.errors import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBuckets:
+    """Per-worker estimate of each client's bucket, refreshed from Redis.
+
+    While the estimate says a client has well over ``headroom`` of its
+    burst left, requests are admitted without a Redis round trip and
+    counted as debt, which the next call to Redis charges. Every worker
+    does this on its own, so the overshoot grows with the worker count: a
+    client can get roughly (1 - headroom) x burst extra requests per
+    additional worker before they have all synced.
+    """
+
+    def __init__(
+        self,
+        headroom: float = Config.RATE_LIMIT_LOCAL_HEADROOM,
+        max_entries: int = Config.RATE_LIMIT_LOCAL_MAX_ENTRIES,
+    ):
+        self.headroom = headroom
+        self.max_entries = max_entries
+        # key -> [tokens at sync, synced at, admitted since]
+        self.entries: OrderedDict = OrderedDict()
+
+    def admit(self, key: str, rate: float, burst: int) -> bool:
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        tokens, synced_at, debt = entry
+        tokens = min(burst, tokens + (time.monotonic() - synced_at) * rate) - debt
+        if tokens - 1 < burst * self.headroom:
+            return False
+        entry[2] += 1
+        return True
+
+    def take_debt(self, key: str) -> int:
+        entry = self.entries.get(key)
+        if entry is None:
+            return 0
+        debt, entry[2] = entry[2], 0
+        return debt
+
+    def sync(self, key: str, tokens: float) -> None:
+        self.entries[key] = [tokens, time.monotonic(), 0]
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+local_buckets = LocalBuckets()
+
+
+def client_ip(request: Request) -> str:
+    """The caller's address, looking past RATE_LIMIT_TRUSTED_PROXY_HOPS proxies.
+
+    Each trusted proxy appends the address it received the request from
+    to X-Forwarded-For, so the client is that many entries from the end.
+    Anything before it was supplied by the client and is ignored.
+    """
+    hops = Config.RATE_LIMIT_TRUSTED_PROXY_HOPS
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if hops and forwarded_for:
+        addresses = [address.strip() for address in forwarded_for.split(",")]
+        return addresses[-min(hops, len(addresses))]
+    return request.client.host if request.client else "unknown"
+
+
+def client_identity(request: Request) -> str:
+    # the user when the token decodes, else the address, which is all
+    # /auth/login has
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer":
+        token_data = decode_token(token)
+        if token_data is not None:
+            return f"user:{token_data['user']['user_id']}"
+    return f"ip:{client_ip(request)}"
+
+
+def rate_limit(name: str, per_minute: int, burst: int):
+    """Dependency that spends one token from the caller's bucket for ``name``.
+
+    Raises RateLimitExceeded, a 429 with Retry-After, once the bucket is
+    empty. If Redis is unreachable the request is let through.
+    """
+    rate = per_minute / 60
+
+    async def check_rate_limit(request: Request) -> None:
+        if not Config.RATE_LIMIT_ENABLED:
+            return
+        key = f"ratelimit:{name}:{client_identity(request)}"
+        if local_buckets.admit(key, rate, burst):
+            return
+
+        debt = local_buckets.take_debt(key)
+        try:
+            allowed, tokens, retry_after = await take_token(key, rate, burst, debt)
+        except RedisError as e:
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return
+        local_buckets.sync(key, tokens)
+        if not allowed:
+            raise RateLimitExceeded(retry_after)
+
+    return check_rate_limit
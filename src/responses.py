@@ -0,0 +1,22 @@
+import uuid
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse as BaseORJSONResponse
+
+
+def encode_fallback(value: Any) -> Any:
+    # asyncpg returns its own UUID subclass, which orjson only encodes as
+    # an exact uuid.UUID
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(BaseORJSONResponse):
+    """orjson response that also accepts rows straight from asyncpg."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, default=encode_fallback, option=orjson.OPT_NON_STR_KEYS
+        )
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+from redis.exceptions import RedisError
+
+from src.config import Config
+from src.db.redis import (
+    acquire_flight_lock,
+    get_flight_result,
+    release_flight_lock,
+    store_flight_result,
+)
+from src.errors import SharedLoadFailed
+from src.responses import encode_fallback
+
+logger = logging.getLogger(__name__)
+
+# published in place of a result when the load raised; never valid JSON
+LOAD_FAILED = b"!failed"
+
+
+class SingleFlight:
+    """Runs one load per key at a time and shares its result with every
+    caller that asks while it is in progress.
+
+    Only for results that are the same for every caller. The load runs
+    in its own task, so a caller that goes away does not fail the others.
+    Loads must therefore not use a request's session.
+
+    With ``use_redis``, the worker holding a short Redis lock loads and
+    publishes the result for SINGLE_FLIGHT_RESULT_TTL_MS. Other workers
+    poll for it instead of loading, and whichever takes the lock next
+    loads if the holder goes away without publishing. If the load raises,
+    a failure marker is published instead and the waiting workers raise
+    SharedLoadFailed rather than all retrying the query. Their results
+    come back JSON-decoded, so UUIDs and datetimes arrive as strings.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        use_redis: bool = Config.SINGLE_FLIGHT_REDIS,
+        lock_ms: int = Config.SINGLE_FLIGHT_LOCK_MS,
+        result_ttl_ms: int = Config.SINGLE_FLIGHT_RESULT_TTL_MS,
+        poll_ms: int = Config.SINGLE_FLIGHT_POLL_MS,
+    ):
+        self.namespace = namespace
+        self.use_redis = use_redis
+        self.lock_ms = lock_ms
+        self.result_ttl_ms = result_ttl_ms
+        self.poll_ms = poll_ms
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, load))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.use_redis:
+            return await load()
+
+        lock_key = f"singleflight:{self.namespace}:{key}:lock"
+        result_key = f"singleflight:{self.namespace}:{key}:result"
+        try:
+            waited = False
+            while True:
+                if await acquire_flight_lock(lock_key, self.lock_ms):
+                    # the previous holder may have published just before
+                    # releasing
+                    result = await get_flight_result(result_key) if waited else None
+                    if result is None:
+                        break
+                    await release_flight_lock(lock_key)
+                    if result == LOAD_FAILED:
+                        raise SharedLoadFailed
+                    return orjson.loads(result)
+                result = await get_flight_result(result_key)
+                if result == LOAD_FAILED:
+                    raise SharedLoadFailed
+                if result is not None:
+                    return orjson.loads(result)
+                waited = True
+                await asyncio.sleep(self.poll_ms / 1000)
+        except RedisError as e:
+            logger.warning(f"Single-flight lock unavailable, loading locally: {e}")
+            return await load()
+
+        try:
+            try:
+                value = await load()
+            except Exception:
+                await self._publish(result_key, LOAD_FAILED)
+                raise
+            await self._publish(
+                result_key, orjson.dumps(value, default=encode_fallback)
+            )
+            return value
+        finally:
+            try:
+                await release_flight_lock(lock_key)
+            except RedisError:
+                pass
+
+    async def _publish(self, result_key: str, result: bytes) -> None:
+        try:
+            await store_flight_result(result_key, result, self.result_ttl_ms)
+        except RedisError as e:
+            logger.warning(f"Could not publish single-flight result: {e}")
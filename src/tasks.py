@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.celery_tasks import (
+    check_project_deletion,
+    delete_project_in_batches,
+    queue_email,
+)
+from src.celery_tasks import delete_project as delete_project_task
+from src.config import Config
+from src.db.redis import get_task_state, store_task_state
+from src.errors import TaskQueueFull
+from src.mail import SMTPPool, create_message, email_templates
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[..., Awaitable[Any]]
+
+
+class TaskBackend(ABC):
+    """Where request handlers send background work.
+
+    ``submit`` runs the backend's job called ``name`` with ``args``. It
+    never blocks the event loop. ``durable`` says whether a submitted job
+    survives this process exiting.
+    """
+
+    durable = True
+
+    def __init__(self, jobs: Dict[str, Job]):
+        self.jobs = jobs
+
+    def register(self, name: str, job: Job) -> None:
+        self.jobs[name] = job
+
+    @abstractmethod
+    async def submit(self, name: str, *args) -> None:
+        pass
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class CeleryBackend(TaskBackend):
+    """Jobs are coroutines that hand the work on to Celery workers."""
+
+    async def submit(self, name: str, *args) -> None:
+        await self.jobs[name](*args)
+
+
+class AsyncQueueBackend(TaskBackend):
+    """Runs jobs on this process's event loop, so small nodes need no Celery.
+
+    The queue is bounded and ``submit`` raises TaskQueueFull rather than
+    letting work pile up. A failed job is retried after an exponential
+    backoff. At shutdown, queued jobs get ``drain_seconds`` to finish and
+    anything left is lost, so only use it for work that tolerates that.
+    """
+
+    durable = False
+
+    def __init__(
+        self,
+        jobs: Dict[str, Job],
+        maxsize: int = Config.TASK_QUEUE_SIZE,
+        workers: int = Config.TASK_WORKERS,
+        max_retries: int = Config.TASK_MAX_RETRIES,
+        retry_delay: float = Config.TASK_RETRY_DELAY_SECONDS,
+        drain_seconds: float = Config.TASK_DRAIN_SECONDS,
+    ):
+        super().__init__(jobs)
+        self.maxsize = maxsize
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.drain_seconds = drain_seconds
+        self.queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self.queue = asyncio.Queue(self.maxsize)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def submit(self, name: str, *args) -> None:
+        try:
+            self.queue.put_nowait((name, args, 0))
+        except asyncio.QueueFull:
+            raise TaskQueueFull
+
+    def _requeue(self, job: Tuple[str, tuple, int]) -> None:
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.error(f"Task queue full, dropping retry of {job[0]}")
+
+    async def _work(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            name, args, attempt = await self.queue.get()
+            try:
+                await self.jobs[name](*args)
+            except Exception as e:
+                if attempt < self.max_retries:
+                    delay = self.retry_delay * 2**attempt
+                    logger.warning(f"Job {name} failed, retrying in {delay}s: {e}")
+                    loop.call_later(delay, self._requeue, (name, args, attempt + 1))
+                else:
+                    logger.exception(f"Job {name} failed after {attempt + 1} tries")
+            finally:
+                self.queue.task_done()
+
+    async def stop(self) -> None:
+        try:
+            await asyncio.wait_for(self.queue.join(), self.drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self.queue.qsize()} queued jobs at shutdown")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+
+# only used by the in-process backend; Celery workers have their own
+smtp_pool = SMTPPool()
+
+
+async def deliver_email(recipients: list[str], template: str, context: dict):
+    subject, body = email_templates.render(template, context)
+    await smtp_pool.send_message(create_message(recipients, subject, body))
+
+
+async def queue_project_delete(task_id: str, project_id: str):
+    await asyncio.to_thread(
+        delete_project_task.apply_async, (project_id,), task_id=task_id
+    )
+
+
+async def run_project_delete(task_id: str, project_id: str):
+    """In-process twin of the Celery delete_project task.
+
+    State goes to Redis in the shape check_project_deletion reports, so
+    the status endpoint works the same with either backend.
+    """
+
+    async def report(progress: dict):
+        await store_task_state(
+            task_id, json.dumps({"status": "PROGRESS", "result": progress})
+        )
+
+    try:
+        await delete_project_in_batches(uuid.UUID(project_id), report)
+    except Exception as e:
+        await store_task_state(
+            task_id,
+            json.dumps({"status": "FAILURE", "result": str(e) or type(e).__name__}),
+        )
+        raise
+    result = {"project_id": project_id, "status": "deleted"}
+    await store_task_state(task_id, json.dumps({"status": "SUCCESS", "result": result}))
+
+
+async def project_deletion_status(task_id: str) -> dict:
+    if Config.TASK_BACKEND != "inprocess":
+        return await asyncio.to_thread(check_project_deletion, task_id)
+    state = await get_task_state(task_id)
+    if state is None:
+        return {"task_id": task_id, "status": "PENDING", "result": None}
+    return {"task_id": task_id, **json.loads(state)}
+
+
+def create_task_backend() -> TaskBackend:
+    if Config.TASK_BACKEND == "inprocess":
+        return AsyncQueueBackend(
+            {"email": deliver_email, "delete_project": run_project_delete}
+        )
+    return CeleryBackend({"email": queue_email, "delete_project": queue_project_delete})
+
+
+task_backend = create_task_backend()
@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.db.main import get_session
+from src.http_cache import make_etag
+from src.ideas import routes
+
+
+def test_anonymous_revalidation_skips_the_aggregate(monkeypatch):
+    idea_id = uuid.uuid4()
+    version = (3, datetime(2026, 1, 1))
+    loads = []
+
+    async def no_timeout(session, timeout_ms):
+        pass
+
+    async def get_idea_detail_version(idea_id, session):
+        return version
+
+    async def get_idea_by_id(idea_id, session, user_id):
+        loads.append(idea_id)
+        return {"id": str(idea_id)}
+
+    async def do(key, load):
+        loads.append(key)
+        return await load()
+
+    monkeypatch.setattr(routes, "apply_statement_timeout", no_timeout)
+    monkeypatch.setattr(
+        routes.idea_service, "get_idea_detail_version", get_idea_detail_version
+    )
+    monkeypatch.setattr(routes.idea_service, "get_idea_by_id", get_idea_by_id)
+    monkeypatch.setattr(routes.detail_flights, "do", do)
+
+    app = FastAPI()
+    app.include_router(routes.idea_router, prefix="/ideas")
+    app.dependency_overrides[get_session] = lambda: None
+
+    etag = make_etag("idea", idea_id, *version, None)
+    response = TestClient(app).get(f"/ideas/{idea_id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert loads == []
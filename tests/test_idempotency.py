@@ -0,0 +1,109 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.auth.utils import create_access_token
+from src.db.redis import token_blocklist
+from src.idempotency import IdempotencyMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # each TestClient runs its own event loop, and Redis connections
+    # cannot move between loops
+    await token_blocklist.connection_pool.disconnect()
+
+
+def make_client(responses):
+    """An app whose idea-creation route answers with ``responses`` in turn."""
+    calls = []
+
+    async def create_idea(request):
+        calls.append(await request.body())
+        status, headers = responses[len(calls) - 1]
+        return JSONResponse({"call": len(calls)}, status, headers)
+
+    app = Starlette(
+        routes=[Route("/api/v1/ideas/", create_idea, methods=["POST"])],
+        lifespan=lifespan,
+    )
+    token = create_access_token(
+        user_data={"email": "a@b.com", "user_id": str(uuid.uuid4()), "username": "a"}
+    )
+    headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": uuid.uuid4().hex}
+    return TestClient(IdempotencyMiddleware(app)), headers, calls
+
+
+def test_rate_limited_request_is_not_replayed():
+    client, headers, calls = make_client([(429, {"Retry-After": "1"}), (201, {})])
+    with client:
+        first = client.post("/api/v1/ideas/", json={"title": "x"}, headers=headers)
+        retry = client.post("/api/v1/ideas/", json={"title": "x"}, headers=headers)
+
+    assert first.status_code == 429
+    assert retry.status_code == 201
+    assert "idempotent-replayed" not in retry.headers
+    assert len(calls) == 2
+
+
+def test_success_is_replayed():
+    client, headers, calls = make_client([(201, {})])
+    with client:
+        first = client.post("/api/v1/ideas/", json={"title": "x"}, headers=headers)
+        retry = client.post("/api/v1/ideas/", json={"title": "x"}, headers=headers)
+
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+
+def test_disconnect_reaches_the_route_after_the_body():
+    messages = []
+
+    async def app(scope, receive, send):
+        messages.append(await receive())
+        messages.append(await receive())
+        await send({"type": "http.response.start", "status": 499, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    incoming = [
+        {"type": "http.request", "body": b'{"title": "x"}', "more_body": False},
+        {"type": "http.disconnect"},
+    ]
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        pass
+
+    token = create_access_token(
+        user_data={"email": "a@b.com", "user_id": str(uuid.uuid4()), "username": "a"}
+    )
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/ideas/",
+        "headers": [
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"idempotency-key", uuid.uuid4().hex.encode()),
+        ],
+    }
+
+    async def run():
+        try:
+            await IdempotencyMiddleware(app)(scope, receive, send)
+        finally:
+            await token_blocklist.connection_pool.disconnect()
+
+    asyncio.run(run())
+
+    assert messages[0]["body"] == b'{"title": "x"}'
+    assert messages[1] == {"type": "http.disconnect"}
@@ -0,0 +1,133 @@
+"""The feed and detail queries can be served by the hot path indexes.
+
+Runs IdeaService against the configured database, captures the SQL it
+emits and EXPLAINs each statement with sequential scans disabled, so a
+plan falls back to a Seq Scan only when no index can serve it. Skipped
+when the database is unreachable or has no ideas.
+"""
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.main import build_engine
+from src.ideas.schemas import IdeaSearchParams
+from src.ideas.services import IdeaService
+
+idea_service = IdeaService()
+
+HOT_TABLES = {"idea", "vote", "comment", "ideacategoryassociation"}
+
+# every index a path's statements must use between them
+EXPECTED_INDEXES = {
+    "feed": {
+        "idx_vote_idea_id_is_upvote",
+        "idx_comment_idea_id_created_at",
+        "ideacategoryassociation_pkey",
+    },
+    "project_feed": {
+        "idx_idea_project_id_created_at",
+        "idx_vote_idea_id_is_upvote",
+        "idx_comment_idea_id_created_at",
+        "ideacategoryassociation_pkey",
+    },
+    "detail": {
+        "idea_pkey",
+        "idx_vote_idea_id_is_upvote",
+        "idx_comment_idea_id_created_at",
+        "ideacategoryassociation_pkey",
+    },
+}
+
+
+def plan_scans(plan: dict, indexes: set, seq_scans: set) -> None:
+    if "Index Name" in plan:
+        indexes.add(plan["Index Name"])
+    if plan.get("Node Type") == "Seq Scan":
+        seq_scans.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        plan_scans(child, indexes, seq_scans)
+
+
+async def capture_statements(engine) -> dict:
+    async with engine.connect() as conn:
+        sample = (
+            await conn.execute(
+                text('SELECT idea.project_id, "user".id FROM idea, "user" LIMIT 1')
+            )
+        ).first()
+    if sample is None:
+        pytest.skip("the database has no ideas")
+    project_id, user_id = sample
+
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        captured.append((statement, parameters))
+
+    def take() -> list:
+        statements = list(captured)
+        captured.clear()
+        return statements
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        async with Session() as session:
+            ideas, _ = await idea_service.search_ideas(
+                session, IdeaSearchParams(limit=20), user_id
+            )
+            statements = {"feed": take()}
+            await idea_service.search_ideas(
+                session, IdeaSearchParams(limit=20, project_id=project_id), user_id
+            )
+            statements["project_feed"] = take()
+            await idea_service.get_idea_by_id(ideas[0]["id"], session, user_id)
+            statements["detail"] = take()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+async def explain_paths() -> dict:
+    engine = build_engine()
+    try:
+        try:
+            statements = await capture_statements(engine)
+        except (OSError, SQLAlchemyError) as e:
+            pytest.skip(f"database unavailable: {e}")
+
+        scans = {}
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+            for path, path_statements in statements.items():
+                indexes, seq_scans = set(), set()
+                for statement, parameters in path_statements:
+                    result = await conn.exec_driver_sql(
+                        f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                    )
+                    plan = result.scalar()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    plan_scans(plan[0]["Plan"], indexes, seq_scans)
+                scans[path] = (indexes, seq_scans)
+        return scans
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def scans():
+    return asyncio.run(explain_paths())
+
+
+@pytest.mark.parametrize("path", sorted(EXPECTED_INDEXES))
+def test_hot_path_uses_expected_indexes(scans, path):
+    indexes, seq_scans = scans[path]
+    assert EXPECTED_INDEXES[path] <= indexes
+    assert not seq_scans & HOT_TABLES
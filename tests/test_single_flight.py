@@ -0,0 +1,82 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from src.db.redis import acquire_flight_lock, release_flight_lock, token_blocklist
+from src.errors import SharedLoadFailed
+from src.single_flight import SingleFlight
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            # asyncio.run makes a new loop per test, and Redis connections
+            # cannot move between loops
+            await token_blocklist.connection_pool.disconnect()
+
+    return asyncio.run(main())
+
+
+def workers(count: int):
+    """Flights that only share Redis, like separate worker processes."""
+    namespace = f"test:{uuid.uuid4().hex}"
+    return [
+        SingleFlight(namespace, use_redis=True, lock_ms=2000, poll_ms=10)
+        for _ in range(count)
+    ]
+
+
+def test_followers_fail_fast_when_the_leader_fails():
+    leader, follower = workers(2)
+    follower_loads = []
+
+    async def failing_load():
+        await asyncio.sleep(0.2)
+        raise TimeoutError("statement timeout")
+
+    async def follower_load():
+        follower_loads.append(1)
+        return "fresh"
+
+    async def scenario():
+        leading = asyncio.create_task(leader.do("feed", failing_load))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        with pytest.raises(SharedLoadFailed):
+            await follower.do("feed", follower_load)
+        with pytest.raises(TimeoutError):
+            await leading
+        return time.monotonic() - started
+
+    waited = run(scenario())
+    assert follower_loads == []
+    assert waited < 1
+
+
+def test_follower_takes_over_when_the_lock_is_dropped():
+    (follower,) = workers(1)
+    lock_key = f"singleflight:{follower.namespace}:feed:lock"
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {"items": []}
+
+    async def scenario():
+        # a leader that went away without publishing anything
+        assert await acquire_flight_lock(lock_key, 2000)
+        waiting = asyncio.create_task(follower.do("feed", load))
+        await asyncio.sleep(0.1)
+        await release_flight_lock(lock_key)
+        started = time.monotonic()
+        result = await waiting
+        return result, time.monotonic() - started
+
+    result, waited = run(scenario())
+    assert result == {"items": []}
+    assert loads == [1]
+    assert waited < 1